@@ -0,0 +1,44 @@
+"""
+Authentication backend that caches User lookups.
+AuthenticationMiddleware resolves request.user on every request; with this
+backend that is a cache hit instead of a SELECT on auth_user. API key auth
+shares the same cached users (get_cached_user). Off unless the cache is
+shared (Redis) - see USER_CACHE in settings.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+USER_CACHE = getattr(settings, 'USER_CACHE', False)
+USER_CACHE_TIMEOUT = 300  # seconds
+
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """User by pk from the cache (loaded on a miss), None if it doesn't exist"""
+    key = user_cache_key(user_id)
+    user = cache.get(key) if USER_CACHE else None
+    if user is None:
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        if USER_CACHE:
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user() is served from the cache"""
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        if user is None:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -1,8 +1,23 @@
+from functools import lru_cache
+
 from django.shortcuts import render,redirect
 from django.contrib.auth.forms import UserCreationForm,AuthenticationForm
 from django.contrib.auth import login,logout
 from .middlewares import middelware,stop_login
 
+
+# Unbound forms render the same every time, so GETs share one instance
+# instead of deep-copying the form fields per request
+@lru_cache(maxsize=None)
+def _empty_register_form():
+    return UserCreationForm()
+
+
+@lru_cache(maxsize=None)
+def _empty_login_form():
+    return AuthenticationForm()
+
+
 # Create your views here.
 @stop_login
 def register_view(request):
@@ -13,7 +28,7 @@ def register_view(request):
             login(request, user)
             return redirect('dashboard:home')
     else:
-        form = UserCreationForm()
+        form = _empty_register_form()
     return render(request, 'authentication_app/register.html', {'form': form})
 
 @stop_login
@@ -25,7 +40,7 @@ def login_view(request):
             login(request, user)
             return redirect('dashboard:home')
     else:
-        form = AuthenticationForm()
+        form = _empty_login_form()
     return render(request, 'authentication_app/login.html', {'form': form})              
 
 @middelware
@@ -1,15 +1,30 @@
 """
-Simple CORS middleware for development.
-In production, use django-cors-headers package.
+Project middleware: a short-circuit for the cron/uptime ping and
+simple CORS middleware for development.
+In production, use django-cors-headers package for CORS.
 """
 from django.http import HttpResponse
 
 
+# Uptime pings are answered before sessions/auth/CSRF/URL routing run
+HEALTH_CHECK_PATHS = frozenset(['/cron/', '/cron'])
+HEALTH_CHECK_BODY = b'{"status": "ok", "message": "Cron job executed successfully"}'
+
+
+# Only the JSON APIs are called cross-origin; pages/admin/static skip the headers
+CORS_PATH_PREFIX = '/api/'
+
+
 class CorsMiddleware:
     """
     Middleware to add CORS headers for API requests (development only).
     """
     
+    allow_origin = '*'
+    allow_methods = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
+    allow_headers = 'Content-Type, X-API-Key, Authorization'
+    max_age = '86400'
+    
     def __init__(self, get_response):
         self.get_response = get_response
     
@@ -17,18 +32,35 @@ class CorsMiddleware:
         # Handle preflight OPTIONS requests immediately
         if request.method == 'OPTIONS':
             response = HttpResponse()
-            response['Access-Control-Allow-Origin'] = '*'
-            response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
-            response['Access-Control-Allow-Headers'] = 'Content-Type, X-API-Key, Authorization'
-            response['Access-Control-Max-Age'] = '86400'
+            response['Access-Control-Allow-Origin'] = self.allow_origin
+            response['Access-Control-Allow-Methods'] = self.allow_methods
+            response['Access-Control-Allow-Headers'] = self.allow_headers
+            response['Access-Control-Max-Age'] = self.max_age
             response.status_code = 200
             return response
         
         response = self.get_response(request)
         
         # Add CORS headers to all API responses
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, X-API-Key, Authorization'
+        if request.path.startswith(CORS_PATH_PREFIX):
+            response['Access-Control-Allow-Origin'] = self.allow_origin
+            response['Access-Control-Allow-Methods'] = self.allow_methods
+            response['Access-Control-Allow-Headers'] = self.allow_headers
         
         return response
+
+
+class HealthCheckMiddleware:
+    """
+    Answers the cron/uptime ping directly. Keep it first in MIDDLEWARE.
+    The body is prebuilt; a new response object is still made per request
+    because the handler attaches per-request state to it.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if request.path in HEALTH_CHECK_PATHS:
+            return HttpResponse(HEALTH_CHECK_BODY, content_type='application/json')
+        return self.get_response(request)
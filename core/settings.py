@@ -62,13 +62,50 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'table_logic.renderers.ORJSONRenderer',  # Faster encoding for row lists
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'table_logic.parsers.ORJSONParser',  # Faster decoding for imports
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
-AUTHETICATION_BACKENDS = [
-    'django.contrib.auth.backend.ModelBackend'
-]
+# Activity logs are buffered and inserted in batches by a background thread
+# (table_logic/activity.py). A batch size of 1 writes synchronously.
+ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 100))
+ACTIVITY_LOG_FLUSH_INTERVAL = 0.2  # seconds
+ACTIVITY_LOG_QUEUE_SIZE = 10000  # When full, entries are written synchronously
+# Imports posted with "wait": false are inserted by a background thread
+# (table_logic/import_queue.py), several imports per transaction
+IMPORT_QUEUE_FLUSH_INTERVAL = 0.2  # seconds
+IMPORT_QUEUE_BATCH_ROWS = 10000  # rows that trigger a flush before the interval
+IMPORT_QUEUE_SIZE = 1000  # queued imports; when full, written synchronously
+# Postgres: don't wait for the WAL flush when an import commits. A crash can
+# then lose the last imports already reported as done (never corrupts data).
+IMPORT_ASYNC_COMMIT = os.environ.get('IMPORT_ASYNC_COMMIT', 'False') == 'True'
+# Postgres: column add/rename/drop gives up after this many ms waiting for
+# its table lock (0 waits forever), so it can't stall the table behind it
+DDL_LOCK_TIMEOUT = int(os.environ.get('DDL_LOCK_TIMEOUT', 5000))
+# Set to False to stop logging public API calls (high-traffic deployments)
+API_ACTIVITY_LOG = os.environ.get('API_ACTIVITY_LOG', 'True') == 'True'
+# Proxies in front of the app that append to X-Forwarded-For (e.g. 1 on
+# Render). The logged client IP is the hop that far from the right; hops
+# further left are client-supplied. Unset trusts the first hop.
+CLIENT_IP_PROXY_COUNT = (
+    int(os.environ['CLIENT_IP_PROXY_COUNT']) if os.environ.get('CLIENT_IP_PROXY_COUNT') else None
+)
+
+# Columns filtered on this many times get an index (table_logic/auto_index.py).
+# 0 turns the advisor off.
+AUTO_INDEX_THRESHOLD = int(os.environ.get('AUTO_INDEX_THRESHOLD', 100))
+AUTO_INDEX_INTERVAL = 60  # seconds between checks
+AUTO_INDEX_MAX_PER_USER = 20  # across all of a user's tables
 
 MIDDLEWARE = [
+    'core.middleware.HealthCheckMiddleware',  # /cron/ ping, skips the rest of the stack
     'core.middleware.CorsMiddleware',  # CORS for API testing
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Static files in production
@@ -103,13 +140,85 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connections are kept open for 10 minutes and health-checked before reuse.
+# With many workers on Postgres, put pgbouncer in front (transaction pooling;
+# 1.21+ for prepared statements) rather than raising the connection count.
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///db.sqlite3',
-        conn_max_age=600
+        conn_max_age=600,
+        conn_health_checks=True,
     )
 }
 
+# psycopg 3 prepares a statement server-side once the same SQL text has run
+# this many times on a connection. User-table SQL text is cached per table and
+# shape (table_logic/queries.py), so repeated API calls reuse one plan.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].setdefault('OPTIONS', {})['prepare_threshold'] = int(
+        os.environ.get('PG_PREPARE_THRESHOLD', 5)
+    )
+    # Exports stream through server-side cursors, which pgbouncer in
+    # transaction pooling mode can't carry across transactions
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = (
+        os.environ.get('PG_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
+    )
+
+
+# Cache
+# Redis when REDIS_URL is set (shared across workers), local memory otherwise
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Reject unknown API keys with a per-process Bloom filter before querying
+# (table_logic/key_filter.py). Its invalidation goes through the cache, so it
+# needs one shared by all processes.
+API_KEY_FILTER = os.environ.get('API_KEY_FILTER', str(bool(REDIS_URL))) == 'True'
+
+# Cache validated API keys (table_logic/models.py). Revoking a key clears its
+# cache entry, which only reaches every process through a shared cache.
+API_KEY_CACHE = os.environ.get('API_KEY_CACHE', str(bool(REDIS_URL))) == 'True'
+
+# Cache User lookups (authentication_app/backends.py). Deactivating or
+# deleting a user clears the entry, which again needs a shared cache.
+USER_CACHE = os.environ.get('USER_CACHE', str(bool(REDIS_URL))) == 'True'
+
+# Cache user table lookups, table lists and row counts (table_logic/queries.py).
+# Schema changes, creates, drops and row writes clear the entries, so without
+# a shared cache the other processes would keep using stale ones.
+TABLE_CACHE = os.environ.get('TABLE_CACHE', str(bool(REDIS_URL))) == 'True'
+
+if USER_CACHE:
+    AUTHENTICATION_BACKENDS = [
+        'authentication_app.backends.CachedModelBackend',  # Caches request.user lookups
+        'django.contrib.auth.backends.ModelBackend',       # Sessions created before the cached backend
+    ]
+else:
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+
+# With a shared cache, sessions are read from it and only fall back to the DB
+# on a miss. A per-process cache would keep serving a session after logout
+# deleted it in another worker, so sessions then stay in the DB alone.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL
+    else 'django.contrib.sessions.backends.db'
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
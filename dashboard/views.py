@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
 from django.conf import settings
 import os
 
@@ -58,14 +59,27 @@ def api_keys(request):
     })
 
 
+DOCS_PATH = os.path.join(settings.BASE_DIR, 'docs.html')
+_docs_cache = {'mtime': None, 'body': b''}
+
+
+def _docs_bytes():
+    """docs.html contents, re-read only when the file changes on disk"""
+    mtime = os.stat(DOCS_PATH).st_mtime
+    if _docs_cache['mtime'] != mtime:
+        with open(DOCS_PATH, 'rb') as f:
+            _docs_cache['body'] = f.read()
+        _docs_cache['mtime'] = mtime
+    return _docs_cache['body']
+
+
+@cache_control(max_age=3600, public=True)
 def docs(request):
     """SDK Documentation page (public, no login required)"""
-    docs_path = os.path.join(settings.BASE_DIR, 'docs.html')
-    return FileResponse(open(docs_path, 'rb'), content_type='text/html')
+    return HttpResponse(_docs_bytes(), content_type='text/html')
 
 
 def cron_handler(request):
     """Cron job endpoint for keeping the service alive or running tasks"""
-    from django.http import JsonResponse
     return JsonResponse({'status': 'ok', 'message': 'Cron job executed successfully'})
 
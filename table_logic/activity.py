@@ -0,0 +1,147 @@
+"""
+Background writer for ActivityLog rows.
+
+Log entries are queued in memory and a daemon thread inserts them in
+batches with bulk_create, so request handlers don't wait on the INSERT.
+Set ACTIVITY_LOG_BATCH_SIZE = 1 to write synchronously instead.
+"""
+import atexit
+import ipaddress
+import logging
+import queue
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ActivityLog
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 100)
+FLUSH_INTERVAL = getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 0.2)  # seconds
+# Bounded so a stalled database can't grow the backlog without limit
+QUEUE_SIZE = getattr(settings, 'ACTIVITY_LOG_QUEUE_SIZE', 10000)
+PROXY_COUNT = getattr(settings, 'CLIENT_IP_PROXY_COUNT', None)
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_write_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(**fields):
+    """
+    Queue one ActivityLog row (same kwargs as ActivityLog.objects.create).
+    Inside transaction.atomic() the entry is only queued once the change it
+    describes has committed (and the synchronous INSERT joins that commit).
+    created_at is stamped here, so the feed's (created_at, id) order is the
+    order events happened in, not the order the writer got to them.
+    """
+    fields.setdefault('created_at', timezone.now())
+    if BATCH_SIZE <= 1:
+        ActivityLog.objects.create(**fields)
+        return
+    _ensure_worker()
+    transaction.on_commit(partial(_put, fields))
+
+
+def client_ip(request):
+    """
+    Client IP, worked out once per request: the X-Forwarded-For hop added by
+    the outermost trusted proxy (see CLIENT_IP_PROXY_COUNT), else REMOTE_ADDR.
+    Anything that isn't an IP address falls back to REMOTE_ADDR, so a junk
+    header can't fail the log INSERT.
+    """
+    try:
+        return request._client_ip
+    except AttributeError:
+        pass
+    ip_address = None
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for and PROXY_COUNT != 0:
+        if PROXY_COUNT is None:
+            ip_address = x_forwarded_for.split(',', 1)[0].strip()
+        else:
+            hops = x_forwarded_for.rsplit(',', PROXY_COUNT)
+            ip_address = hops[-PROXY_COUNT if len(hops) >= PROXY_COUNT else 0].strip()
+        try:
+            ipaddress.ip_address(ip_address)
+        except ValueError:
+            ip_address = None
+    if ip_address is None:
+        ip_address = request.META.get('REMOTE_ADDR')
+    request._client_ip = ip_address
+    return ip_address
+
+
+def flush():
+    """Write everything queued so far and wait for the worker to catch up"""
+    while True:
+        batch = []
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            break
+        _write(batch)
+    _queue.join()
+
+
+def _put(fields):
+    try:
+        _queue.put_nowait(fields)
+    except queue.Full:
+        # Writer can't keep up - fall back to a synchronous insert
+        try:
+            ActivityLog.objects.create(**fields)
+        except Exception:
+            logger.exception('Failed to write activity log entry')
+
+
+def _write(batch):
+    with _write_lock:
+        try:
+            close_old_connections()
+            ActivityLog.objects.bulk_create([ActivityLog(**fields) for fields in batch])
+        except Exception:
+            logger.exception('Failed to write %d activity log entries', len(batch))
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _run():
+    while True:
+        batch = [_queue.get()]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write(batch)
+
+
+def _ensure_worker():
+    """Start the writer thread on first use (and again in forked workers)"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        first_start = _worker is None
+        _worker = threading.Thread(target=_run, name='activity-log-writer', daemon=True)
+        _worker.start()
+        if first_start:
+            atexit.register(flush)
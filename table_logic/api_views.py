@@ -2,35 +2,97 @@
 Public API views for external access (v1).
 Uses API Key authentication instead of session-based auth.
 """
+import json
+import re
+from functools import lru_cache
+from operator import itemgetter
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.db import connection
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
 
+from . import activity, auto_index
 from .authentication import APIKeyAuthentication
-from .models import UserTable, ActivityLog, APIKey
+from .models import UserTable, APIKey
+from .queries import (
+    MAX_INSERT_PARAMS,
+    SCHEMA_APPEND_SQL,
+    SCHEMA_REMOVE_SQL,
+    SCHEMA_RENAME_SQL,
+    column_type_sql,
+    count_rows,
+    count_sql,
+    cursor_seek,
+    delete_by_key_sql,
+    delete_by_rowid_sql,
+    get_row_count,
+    get_user_table,
+    get_user_table_for_update,
+    insert_many_sql,
+    insert_sql,
+    invalidate_row_count,
+    is_valid_column_type,
+    is_valid_identifier,
+    limit_ddl_lock_wait,
+    list_user_tables,
+    quote_ident,
+    save_schema,
+    search_expr_sql,
+    select_by_key_sql,
+    select_by_rowid_sql,
+    select_keyset_sql,
+    select_page_sql,
+    select_page_with_total_sql,
+    update_by_key_sql,
+    update_by_rowid_sql,
+)
+
+
+# Upper bound for a single bulk insert request
+MAX_BULK_ROWS = 1000
+
+# Default page size for the API key list when ?page= / ?limit= is given
+API_KEY_PAGE_SIZE = 50
+
+# False skips activity logging for public API calls entirely
+API_ACTIVITY_LOG = getattr(settings, 'API_ACTIVITY_LOG', True)
+
+
+def _returning_column(user_table):
+    """PK column for INSERT ... RETURNING on Postgres, None elsewhere"""
+    return user_table['pk_col'] if connection.vendor == 'postgresql' else None
+
+
+def _unknown_columns_error(column_set, keys):
+    """400 response if any row key isn't one of the table's columns, else None"""
+    unknown = [key for key in keys if key not in column_set]
+    if not unknown:
+        return None
+    return Response({
+        'success': False,
+        'error': f'Unknown column(s): {", ".join(map(str, unknown))}'
+    }, status=status.HTTP_400_BAD_REQUEST)
 
 
 def log_api_activity(user, action, table_name, description, metadata=None, request=None):
     """Log API activity with source marked as 'API'"""
-    ip_address = None
-    if request:
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip_address = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip_address = request.META.get('REMOTE_ADDR')
+    if not API_ACTIVITY_LOG:
+        return
+    
+    ip_address = activity.client_ip(request) if request else None
     
     # Add API source to metadata
-    if metadata is None:
-        metadata = {}
-    metadata['source'] = 'api'
-    if hasattr(request, 'auth') and isinstance(request.auth, APIKey):
-        metadata['api_key_name'] = request.auth.name
+    metadata = {'source': 'api', **metadata} if metadata else {'source': 'api'}
+    auth = getattr(request, 'auth', None)
+    if isinstance(auth, APIKey):
+        metadata['api_key_name'] = auth.name
     
-    ActivityLog.objects.create(
-        user=user,
+    # Written in batches by a background thread, off the request path
+    activity.enqueue(
+        user_id=user.id,
         action=action,
         table_name=table_name,
         description=description,
@@ -39,6 +101,110 @@ def log_api_activity(user, action, table_name, description, metadata=None, reque
     )
 
 
+# Query params of the rows endpoint that are not column filters
+RESERVED_ROW_PARAMS = frozenset([
+    'page', 'limit', 'offset', 'sort', 'order', 'search', 'shape', 'after_rowid', 'cursor', 'count',
+])
+
+# Filter suffix -> SQL operator (col=val, col__gt=val, ...)
+FILTER_OPERATORS = {
+    '': '=',
+    'gt': '>',
+    'lt': '<',
+    'gte': '>=',
+    'lte': '<=',
+    'ne': '!=',
+    'contains': 'LIKE',
+    'icontains': 'ILIKE',
+}
+
+
+@lru_cache(maxsize=1024)
+def _compile_filters(schema_columns, filter_keys, has_search, vendor):
+    """
+    WHERE clauses for one request shape - the table's columns, the filter
+    params present and whether there is a search - built once and reused.
+    Returns (clauses, bindings); each binding is a (query param, kind) pair
+    telling _bind_filter_value how to turn the request into a parameter.
+    """
+    clauses = []
+    bindings = []
+    column_set = frozenset(schema_columns)
+    
+    # 1. Search
+    if has_search and schema_columns and vendor == 'postgresql':
+        # One case-insensitive match over all columns (the index advisor puts
+        # a pg_trgm GIN index on this expression) instead of an OR of CASTs
+        clauses.append(f'{search_expr_sql(schema_columns)} ILIKE %s')
+        bindings.append(('search', 'search'))
+    elif has_search and schema_columns:
+        # Search all columns that look like text? Or just convert everything to text
+        search_conditions = [f'CAST({quote_ident(col)} AS TEXT) LIKE %s' for col in schema_columns]
+        clauses.append(f"({' OR '.join(search_conditions)})")
+        bindings.extend([('search', 'search')] * len(schema_columns))
+    
+    # 2. Filters (col=val, col__gt=val, etc)
+    for key in filter_keys:
+        # Check for operator suffix
+        parts = key.split('__')
+        col_name = parts[0]
+        op_suffix = parts[1] if len(parts) > 1 else ''
+        
+        if col_name in column_set and op_suffix in FILTER_OPERATORS:
+            operator = FILTER_OPERATORS[op_suffix]
+            
+            # SQLite doesn't support ILIKE standardly (though some builds do)
+            # LIKE is case insensitive in SQLite default for ASCII
+            if vendor == 'sqlite' and operator == 'ILIKE':
+                operator = 'LIKE'
+            
+            clauses.append(f'{quote_ident(col_name)} {operator} %s')
+            bindings.append((key, 'like' if 'contains' in op_suffix else 'value'))
+    
+    return tuple(clauses), tuple(bindings)
+
+
+def _bind_filter_value(query_params, key, kind, search):
+    if kind == 'search':
+        return f'%{search}%'
+    value = query_params.get(key)
+    # Handle LIKE wildcards if not present
+    if kind == 'like' and '%' not in value:
+        return f'%{value}%'
+    return value
+
+
+def _row_key(user_table):
+    """What identifies a row: rowid on SQLite, the primary key column on Postgres (no rowid there)"""
+    return 'rowid' if connection.vendor == 'sqlite' else user_table['pk_col']
+
+
+def _missing_key_error(user_table, key):
+    """400 response if the table lacks the `key` column rows are addressed by, else None"""
+    if key == 'rowid' or key in user_table['column_set']:
+        return None
+    return Response({
+        'success': False,
+        'error': 'This table has no primary key column to address rows by'
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _rowid_seek(after_rowid, order, key='rowid'):
+    """
+    Keyset pieces for ?after_rowid= - next_cursor is the last row's key:
+    its rowid (selected last), or the primary key column on Postgres
+    """
+    if key == 'rowid':
+        key_sql = 'rowid'
+        make_cursor = lambda row, columns: row[-1]
+    else:
+        key_sql = quote_ident(key)
+        make_cursor = lambda row, columns: row[columns.index(key)]
+    if order == 'desc':
+        return f'{key_sql} < %s', [after_rowid], f'ORDER BY {key_sql} DESC', make_cursor
+    return f'{key_sql} > %s', [after_rowid], f'ORDER BY {key_sql} ASC', make_cursor
+
+
 # =============================================
 # PUBLIC API VIEWS (API Key Auth)
 # =============================================
@@ -60,21 +226,18 @@ class PublicTableListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        tables = UserTable.objects.filter(user=request.user)
+        # Cached per user, without the schema JSON
+        tables = list_user_tables(request.user.id)
+
+        # One UNION ALL query instead of a COUNT(*) round trip per table
+        row_counts = count_rows(table['real_name'] for table in tables)
+
         result = []
-        
         for table in tables:
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute(f'SELECT COUNT(*) FROM "{table.real_name}"')
-                    row_count = cursor.fetchone()[0]
-            except:
-                row_count = 0
-            
             result.append({
-                'name': table.table_name,
-                'row_count': row_count,
-                'created_at': table.created_at.isoformat(),
+                'name': table['table_name'],
+                'row_count': row_counts.get(table['real_name'], 0),
+                'created_at': table['created_at'].isoformat(),
             })
         
         return Response({
@@ -91,10 +254,9 @@ class PublicTableListView(APIView):
         if not name or not columns:
             return Response({'success': False, 'error': 'Name and columns are required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Copied logic from TableListCreateView.post
-        if UserTable.objects.filter(user=request.user, table_name=name).exists():
-            return Response({'success': False, 'error': f'Table "{name}" already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
+        if not is_valid_identifier(name):
+            return Response({'success': False, 'error': f'Invalid table name: {name}'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Generate unique real table name
         real_name = f"u{request.user.id}_{name}"
         
@@ -105,36 +267,39 @@ class PublicTableListView(APIView):
             col_type = col.get('type', 'TEXT').upper()
             
             # Basic sanitization
-            if not col_name.isidentifier(): 
+            if not is_valid_identifier(col_name):
                  return Response({'success': False, 'error': f'Invalid column name: {col_name}'}, status=status.HTTP_400_BAD_REQUEST)
+            if not is_valid_column_type(col_type):
+                 return Response({'success': False, 'error': f'Invalid column type: {col_type}'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Determine mapping
-            if connection.vendor != 'sqlite':
-                if col_type == 'BLOB': col_type = 'BYTEA'
-                elif col_type == 'DATETIME': col_type = 'TIMESTAMP'
+            col_type = column_type_sql(col_type)
 
             # Primary Key?
             # We don't support complex PK config via this simple API for now, assume standard config
             # Or trust the input since it's authenticated
-            col_def = f'"{col_name}" {col_type}'
+            col_def = f'{quote_ident(col_name)} {col_type}'
             column_defs.append(col_def)
         
         # Fallback if no columns? SQLite needs at least one.
         if not column_defs:
              return Response({'success': False, 'error': 'At least one column required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        sql = f'CREATE TABLE "{real_name}" ({", ".join(column_defs)})'
+        sql = f'CREATE TABLE {quote_ident(real_name)} ({", ".join(column_defs)})'
         
         try:
-            with connection.cursor() as cursor:
-                cursor.execute(sql)
-            
-            UserTable.objects.create(
-                user=request.user,
-                table_name=name,
-                real_name=real_name,
-                schema=columns
-            )
+            # The unique (user, table_name) index turns a duplicate, even two
+            # racing creates, into an IntegrityError before the CREATE TABLE runs
+            with transaction.atomic():
+                UserTable.objects.create(
+                    user=request.user,
+                    table_name=name,
+                    real_name=real_name,
+                    schema=columns
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+            invalidate_row_count(real_name)
             
             log_api_activity(request.user, 'CREATE_TABLE', name, f'Created table "{name}" via API', request=request)
             
@@ -142,6 +307,8 @@ class PublicTableListView(APIView):
                 'success': True,
                 'message': f'Table "{name}" created successfully'
             }, status=status.HTTP_201_CREATED)
+        except IntegrityError:
+            return Response({'success': False, 'error': f'Table "{name}" already exists'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -164,27 +331,21 @@ class PublicTableDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, table_name):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(f'SELECT COUNT(*) FROM "{user_table.real_name}"')
-                row_count = cursor.fetchone()[0]
-        except:
-            row_count = 0
+        row_count = get_row_count(user_table['real_name'])
         
         return Response({
             'success': True,
             'name': table_name,
-            'columns': user_table.schema,
+            'columns': user_table['schema'],
             'row_count': row_count,
-            'created_at': user_table.created_at.isoformat(),
+            'created_at': user_table['created_at'].isoformat(),
         })
 
 
@@ -201,87 +362,104 @@ class PublicTableRowsView(APIView):
         limit (int): Rows per page (default: 25, max: 100)
         sort (str): Column to sort by
         order (str): 'asc' or 'desc'
+        shape (str): 'compact' returns {"columns": [...], "rows": [[...], ...]}
+                     instead of one object per row
+        after_rowid (int): Keyset pagination - return rows after this rowid
+                     (the primary key on Postgres; ordered by it, `order`
+                     applies). Pass the response's
+                     `next_cursor` to get the next page. Skips the total count
+                     unless count=1 is given.
+        count (str): '0' skips the total count (no total/total_pages in the
+                     response) on page/offset requests
+        cursor (str): Keyset pagination that follows `sort`/`order`. Send an
+                     empty cursor for the first page, then the response's
+                     opaque `next_cursor`. NULLs sort last (first with desc).
+                     Preferred over page/offset for large or busy tables.
     
     POST Body:
         {"column1": "value1", "column2": "value2"}
+        or a list of such objects (same columns, up to 1000) for a bulk insert
     """
     authentication_classes = [APIKeyAuthentication]
     permission_classes = [IsAuthenticated]
     
     def get(self, request, table_name):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        real_name = user_table['real_name']
+        key = _row_key(user_table)
+        # PostgreSQL has no rowid column
+        with_rowid = key == 'rowid'
+        
         # Parse query params
         try:
             page = int(request.query_params.get('page', 1))
-            limit = min(int(request.query_params.get('limit', 25)), 100)
+            limit = min(max(int(request.query_params.get('limit', 25)), 1), 100)
             offset = int(request.query_params.get('offset', (page - 1) * limit))
             sort = request.query_params.get('sort', '')
             order = request.query_params.get('order', 'asc').lower()
             if order not in ['asc', 'desc']:
                 order = 'asc'
             search = request.query_params.get('search', '').strip()
+            compact = request.query_params.get('shape') == 'compact'
+            after_rowid = request.query_params.get('after_rowid')
+            if after_rowid is not None:
+                after_rowid = int(after_rowid)
+            page_cursor = request.query_params.get('cursor')
             
             with connection.cursor() as cursor:
-                schema_columns = [col.get('name') for col in user_table.schema]
+                schema_columns = user_table['columns']
+                column_set = user_table['column_set']
                 
-                # Build WHERE clause
-                where_clauses = []
-                params = []
-                
-                # 1. Search
+                # Build WHERE clause (search + col=val, col__gt=val, etc)
+                filter_keys = tuple(sorted(
+                    key for key in request.query_params if key not in RESERVED_ROW_PARAMS
+                ))
+                clauses, bindings = _compile_filters(
+                    schema_columns, filter_keys, bool(search), connection.vendor
+                )
+                where_clauses = list(clauses)
+                params = [
+                    _bind_filter_value(request.query_params, key, kind, search)
+                    for key, kind in bindings
+                ]
+                # Only = / != / range filters: a B-tree index can't serve
+                # __contains / __icontains (LIKE '%v%')
+                auto_index.record(request.user.id, table_name, real_name, [
+                    key.split('__', 1)[0] for key, kind in bindings if kind == 'value'
+                ])
                 if search:
-                    search_conditions = []
-                    # Search all columns that look like text? Or just convert everything to text
-                    for col in schema_columns:
-                        search_conditions.append(f'CAST("{col}" AS TEXT) LIKE %s')
-                        params.append(f'%{search}%')
-                    if search_conditions:
-                        where_clauses.append(f"({' OR '.join(search_conditions)})")
-
-                # 2. Filters (col=val, col__gt=val, etc)
-                # Operators map: suffix -> sql op
-                operators = {
-                    '': '=',
-                    'gt': '>',
-                    'lt': '<',
-                    'gte': '>=',
-                    'lte': '<=',
-                    'ne': '!=',
-                    'contains': 'LIKE',
-                    'icontains': 'ILIKE',
-                }
+                    auto_index.record_search(request.user.id, table_name, real_name, schema_columns)
+
+                if after_rowid is not None or page_cursor is not None:
+                    error = _missing_key_error(user_table, key)
+                    if error is not None:
+                        return error
                 
-                for key, value in request.query_params.items():
-                    # Skip reserved keys
-                    if key in ['page', 'limit', 'offset', 'sort', 'order', 'search']:
-                        continue
-                        
-                    # Check for operator suffix
-                    parts = key.split('__')
-                    col_name = parts[0]
-                    op_suffix = parts[1] if len(parts) > 1 else ''
-                    
-                    if col_name in schema_columns and op_suffix in operators:
-                        operator = operators[op_suffix]
-                        
-                        # Handle LIKE wildcards if not present
-                        if 'contains' in op_suffix and '%' not in value:
-                            value = f'%{value}%'
-                            
-                        # SQLite doesn't support ILIKE standardly (though some builds do)
-                        # Fallback for SQLite to Upper() = Upper() if needed, but LIKE is case insensitive in SQLite default for ASCII
-                        if connection.vendor == 'sqlite' and operator == 'ILIKE':
-                            operator = 'LIKE' 
-
-                        where_clauses.append(f'"{col_name}" {operator} %s')
-                        params.append(value)
+                if after_rowid is not None:
+                    return self._keyset_page(
+                        request, cursor, real_name, where_clauses, params,
+                        _rowid_seek(after_rowid, order, key), limit, compact, with_rowid,
+                    )
+                
+                if page_cursor is not None:
+                    sort_col = sort if sort in column_set else None
+                    try:
+                        seek = cursor_seek(page_cursor, sort_col, order, key)
+                    except ValueError:
+                        return Response({
+                            'success': False,
+                            'error': 'Invalid cursor'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+                    return self._keyset_page(
+                        request, cursor, real_name, where_clauses, params,
+                        seek, limit, compact, with_rowid,
+                    )
 
                 where_sql = ""
                 if where_clauses:
@@ -289,45 +467,122 @@ class PublicTableRowsView(APIView):
 
                 # Build ORDER BY clause
                 order_clause = ""
-                if sort and sort in schema_columns:
+                if sort and sort in column_set:
                     order_direction = "DESC" if order == "desc" else "ASC"
-                    order_clause = f'ORDER BY "{sort}" {order_direction}'
+                    order_clause = f'ORDER BY {quote_ident(sort)} {order_direction}'
                 
-                # Get total count
-                count_sql = f'SELECT COUNT(*) FROM "{user_table.real_name}" {where_sql}'
-                cursor.execute(count_sql, params)
-                total = cursor.fetchone()[0]
+                include_total = request.query_params.get('count', '1') != '0'
+                total = None
                 
                 # Get rows
                 # SQLite Needs rowid selected explicitly if we want to use it for updates later
-                rows_sql = f'SELECT *, rowid FROM "{user_table.real_name}" {where_sql} {order_clause} LIMIT {limit} OFFSET {offset}'
-                cursor.execute(rows_sql, params)
-                columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                if include_total and where_clauses:
+                    # Filtered total rides along as a window column - one statement, one scan
+                    rows_sql = select_page_with_total_sql(real_name, where_sql, order_clause, with_rowid)
+                    cursor.execute(rows_sql, params + [limit, offset])
+                    columns = tuple(desc[0] for desc in cursor.description[:-1])
+                    fetched = cursor.fetchmany(limit)
+                    if fetched:
+                        # columns leaves out the total, so zip() drops it below
+                        # without copying each row first
+                        total = fetched[0][-1]
+                    elif offset > 0:
+                        # Past the last page - the window has no row to report on
+                        cursor.execute(count_sql(real_name, where_sql), params)
+                        total = cursor.fetchone()[0]
+                    else:
+                        total = 0
+                else:
+                    if include_total:
+                        # Unfiltered counts come from the row count cache
+                        total = get_row_count(real_name)
+                    cursor.execute(select_page_sql(real_name, where_sql, order_clause, with_rowid), params + [limit, offset])
+                    columns = tuple(desc[0] for desc in cursor.description) if cursor.description else ()
+                    fetched = cursor.fetchmany(limit)
+                
+                # Compact shape sends column names once instead of a dict per row
+                if compact:
+                    width = len(columns)
+                    rows = [list(row[:width]) for row in fetched]
+                else:
+                    rows = [dict(zip(columns, row)) for row in fetched]
             
-            return Response({
+            payload = {
                 'success': True,
                 'rows': rows,
-                'total': total,
                 'page': page,
                 'limit': limit,
-                'total_pages': (total + limit - 1) // limit if limit > 0 else 0,
-            })
+            }
+            if total is not None:
+                payload['total'] = total
+                payload['total_pages'] = (total + limit - 1) // limit
+            if compact:
+                payload['columns'] = list(columns)
+            return Response(payload)
         except Exception as e:
             return Response({
                 'success': False,
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _keyset_page(self, request, cursor, real_name, where_clauses, params,
+                     seek, limit, compact, with_rowid=True):
+        """
+        Seek past the previous page (see _rowid_seek/queries.cursor_seek) instead of
+        using OFFSET, so deep pages cost the same as the first one.
+        The total is only counted on request.
+        """
+        seek_sql, seek_params, order_clause, make_cursor = seek
+        
+        total = None
+        if request.query_params.get('count') == '1':
+            if where_clauses:
+                where_sql = "WHERE " + " AND ".join(where_clauses)
+                cursor.execute(count_sql(real_name, where_sql), params)
+                total = cursor.fetchone()[0]
+            else:
+                total = get_row_count(real_name)
+        
+        if seek_sql:
+            where_clauses = where_clauses + [seek_sql]
+        where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+        cursor.execute(select_keyset_sql(real_name, where_sql, order_clause, with_rowid), params + seek_params + [limit])
+        
+        columns = tuple(desc[0] for desc in cursor.description) if cursor.description else ()
+        fetched = cursor.fetchmany(limit)
+        if compact:
+            rows = [list(row) for row in fetched]
+        else:
+            rows = [dict(zip(columns, row)) for row in fetched]
+        
+        next_cursor = make_cursor(fetched[-1], columns) if fetched and len(fetched) == limit else None
+        
+        payload = {
+            'success': True,
+            'rows': rows,
+            'limit': limit,
+            'next_cursor': next_cursor,
+        }
+        if total is not None:
+            payload['total'] = total
+        if compact:
+            payload['columns'] = list(columns)
+        return Response(payload)
+    
     def post(self, request, table_name):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        real_name = user_table['real_name']
+        key = _row_key(user_table)
+        error = _missing_key_error(user_table, key)
+        if error is not None:
+            return error
+        
         try:
             data = request.data
             if not data:
@@ -336,39 +591,37 @@ class PublicTableRowsView(APIView):
                     'error': 'Request body is empty'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            columns = list(data.keys())
-            values = list(data.values())
-            placeholders = ', '.join(['%s' for _ in values])
-            columns_str = ', '.join([f'"{col}"' for col in columns])
+            # A list body inserts many rows in one go
+            if isinstance(data, list):
+                return self._bulk_insert(request, table_name, user_table, data)
             
-            sql = f'INSERT INTO "{user_table.real_name}" ({columns_str}) VALUES ({placeholders})'
+            error = _unknown_columns_error(user_table['column_set'], data.keys())
+            if error is not None:
+                return error
             
-            if connection.vendor == 'postgresql':
-                # Find PK column
-                pk_col = 'id'
-                for col in user_table.schema:
-                    if col.get('pk'):
-                        pk_col = col.get('name')
-                        break
-                        
-                sql += f' RETURNING "{pk_col}"'
-                with connection.cursor() as cursor:
-                    cursor.execute(sql, values)
-                    row_id = cursor.fetchone()[0]
-            else:
+            pk_col = _returning_column(user_table)
+            sql = insert_sql(real_name, tuple(data.keys()), pk_col)
+            values = list(data.values())
+            
+            # Row and its activity log entry commit together
+            with transaction.atomic():
                 with connection.cursor() as cursor:
                     cursor.execute(sql, values)
-                    row_id = cursor.lastrowid
-            
-            # Log activity
-            log_api_activity(
-                user=request.user,
-                action='INSERT_ROW',
-                table_name=table_name,
-                description=f'Inserted row via API into "{table_name}"',
-                metadata={'row_id': row_id, 'data': data},
-                request=request
-            )
+                    if connection.vendor == 'postgresql':
+                        row_id = cursor.fetchone()[0]
+                    else:
+                        row_id = cursor.lastrowid
+                
+                # Log activity
+                log_api_activity(
+                    user=request.user,
+                    action='INSERT_ROW',
+                    table_name=table_name,
+                    description=f'Inserted row via API into "{table_name}"',
+                    metadata={'row_id': row_id, 'data': data},
+                    request=request
+                )
+            invalidate_row_count(real_name)
             
             return Response({
                 'success': True,
@@ -380,6 +633,80 @@ class PublicTableRowsView(APIView):
                 'success': False,
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def _bulk_insert(self, request, table_name, user_table, rows):
+        """
+        Insert a list of rows inside a single transaction: one executemany on
+        SQLite, multi-row INSERT ... RETURNING statements on Postgres (which
+        also gives back the new ids).
+        """
+        real_name = user_table['real_name']
+        if len(rows) > MAX_BULK_ROWS:
+            return Response({
+                'success': False,
+                'error': f'At most {MAX_BULK_ROWS} rows per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not all(isinstance(row, dict) and row for row in rows):
+            return Response({
+                'success': False,
+                'error': 'Every row must be a non-empty object'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # All rows must share the first row's columns so one statement fits all
+        columns = tuple(rows[0].keys())
+        column_set = rows[0].keys()
+        for i, row in enumerate(rows):
+            if row.keys() != column_set:
+                return Response({
+                    'success': False,
+                    'error': f'Row {i}: all rows must have the same columns'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        error = _unknown_columns_error(user_table['column_set'], columns)
+        if error is not None:
+            return error
+        
+        if len(columns) == 1:
+            values = [(row[columns[0]],) for row in rows]
+        else:
+            # itemgetter pulls every column of a row in one C call
+            values = list(map(itemgetter(*columns), rows))
+        
+        pk_col = _returning_column(user_table)
+        ids = None
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if pk_col:
+                    ids = []
+                    # Stay under the driver's bind parameter limit
+                    chunk = max(1, MAX_INSERT_PARAMS // len(columns))
+                    for start in range(0, len(values), chunk):
+                        batch = values[start:start + chunk]
+                        sql = insert_many_sql(real_name, columns, len(batch), pk_col)
+                        cursor.execute(sql, [value for row in batch for value in row])
+                        ids.extend(row[0] for row in cursor.fetchall())
+                else:
+                    cursor.executemany(insert_sql(real_name, columns), values)
+            
+            log_api_activity(
+                user=request.user,
+                action='INSERT_ROW',
+                table_name=table_name,
+                description=f'Inserted {len(rows)} rows via API into "{table_name}"',
+                metadata={'count': len(rows)},
+                request=request
+            )
+        invalidate_row_count(real_name)
+        
+        payload = {
+            'success': True,
+            'message': f'{len(rows)} rows inserted',
+            'count': len(rows)
+        }
+        if ids is not None:
+            payload['ids'] = ids
+        return Response(payload, status=status.HTTP_201_CREATED)
 
 
 class PublicTableRowDetailView(APIView):
@@ -395,17 +722,35 @@ class PublicTableRowDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, table_name, row_id):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        real_name = user_table['real_name']
+        key = _row_key(user_table)
+        error = _missing_key_error(user_table, key)
+        if error is not None:
+            return error
+        
+        # ?fields=a,b returns just those columns (plus rowid, or the primary key)
+        fields = request.query_params.get('fields')
+        if fields:
+            fields = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+            error = _unknown_columns_error(user_table['column_set'], fields)
+            if error is not None:
+                return error
+        
+        if key == 'rowid':
+            sql = select_by_rowid_sql(real_name, fields or None)
+        else:
+            sql = select_by_key_sql(real_name, key, fields or None)
+        
         try:
             with connection.cursor() as cursor:
-                cursor.execute(f'SELECT *, rowid FROM "{user_table.real_name}" WHERE rowid = %s', [row_id])
+                cursor.execute(sql, [row_id])
                 columns = [desc[0] for desc in cursor.description] if cursor.description else []
                 row = cursor.fetchone()
                 
@@ -426,14 +771,19 @@ class PublicTableRowDetailView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def put(self, request, table_name, row_id):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        real_name = user_table['real_name']
+        key = _row_key(user_table)
+        error = _missing_key_error(user_table, key)
+        if error is not None:
+            return error
+        
         try:
             data = request.data
             if not data:
@@ -442,36 +792,38 @@ class PublicTableRowDetailView(APIView):
                     'error': 'Request body is empty'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            set_clause_parts = []
-            values = []
-            for col, val in data.items():
-                set_clause_parts.append(f'"{col}" = %s')
-                values.append(val)
+            error = _unknown_columns_error(user_table['column_set'], data.keys())
+            if error is not None:
+                return error
             
-            set_clause = ', '.join(set_clause_parts)
+            if key == 'rowid':
+                sql = update_by_rowid_sql(real_name, tuple(data.keys()))
+            else:
+                sql = update_by_key_sql(real_name, tuple(data.keys()), key)
+            values = list(data.values())
             values.append(row_id)
             
-            sql = f'UPDATE "{user_table.real_name}" SET {set_clause} WHERE rowid = %s'
-            
-            with connection.cursor() as cursor:
-                cursor.execute(sql, values)
-                updated = cursor.rowcount
-            
-            if updated == 0:
-                return Response({
-                    'success': False,
-                    'error': 'Row not found'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            # Log activity
-            log_api_activity(
-                user=request.user,
-                action='UPDATE_ROW',
-                table_name=table_name,
-                description=f'Updated row {row_id} via API in "{table_name}"',
-                metadata={'row_id': row_id, 'updated_fields': list(data.keys())},
-                request=request
-            )
+            # Update and its activity log entry commit together
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, values)
+                    updated = cursor.rowcount
+                
+                if updated == 0:
+                    return Response({
+                        'success': False,
+                        'error': 'Row not found'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                
+                # Log activity
+                log_api_activity(
+                    user=request.user,
+                    action='UPDATE_ROW',
+                    table_name=table_name,
+                    description=f'Updated row {row_id} via API in "{table_name}"',
+                    metadata={'row_id': row_id, 'updated_fields': list(data.keys())},
+                    request=request
+                )
             
             return Response({
                 'success': True,
@@ -484,34 +836,43 @@ class PublicTableRowDetailView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def delete(self, request, table_name, row_id):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        real_name = user_table['real_name']
+        key = _row_key(user_table)
+        error = _missing_key_error(user_table, key)
+        if error is not None:
+            return error
+        sql = delete_by_rowid_sql(real_name) if key == 'rowid' else delete_by_key_sql(real_name, key)
+        
         try:
-            with connection.cursor() as cursor:
-                cursor.execute(f'DELETE FROM "{user_table.real_name}" WHERE rowid = %s', [row_id])
-                deleted = cursor.rowcount
-            
-            if deleted == 0:
-                return Response({
-                    'success': False,
-                    'error': 'Row not found'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            # Log activity
-            log_api_activity(
-                user=request.user,
-                action='DELETE_ROW',
-                table_name=table_name,
-                description=f'Deleted row {row_id} via API from "{table_name}"',
-                metadata={'row_id': row_id},
-                request=request
-            )
+            # Delete and its activity log entry commit together
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, [row_id])
+                    deleted = cursor.rowcount
+                
+                if deleted == 0:
+                    return Response({
+                        'success': False,
+                        'error': 'Row not found'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                
+                # Log activity
+                log_api_activity(
+                    user=request.user,
+                    action='DELETE_ROW',
+                    table_name=table_name,
+                    description=f'Deleted row {row_id} via API from "{table_name}"',
+                    metadata={'row_id': row_id},
+                    request=request
+                )
+            invalidate_row_count(real_name)
             
             return Response({
                 'success': True,
@@ -524,6 +885,113 @@ class PublicTableRowDetailView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Leading (possibly quoted) name of a column definition in CREATE TABLE SQL
+SQLITE_DEF_NAME_RE = re.compile(r'\s*(?:"((?:[^"]|"")*)"|\[([^\]]*)\]|`([^`]*)`|(\w+))')
+SQLITE_IDENT_RE = re.compile(r'"((?:[^"]|"")*)"|\[([^\]]*)\]|`([^`]*)`|(\w+)')
+SQLITE_TABLE_CONSTRAINTS = frozenset(['constraint', 'primary', 'unique', 'check', 'foreign'])
+
+
+def _sqlite_ident(match):
+    quoted, bracketed, backticked, bare = match.groups()
+    if quoted is not None:
+        return quoted.replace('""', '"').lower()
+    return (bracketed if bracketed is not None else backticked if backticked is not None else bare).lower()
+
+
+def _sqlite_table_defs(create_sql):
+    """Top-level comma-separated items (columns and constraints) of CREATE TABLE SQL"""
+    body = create_sql[create_sql.index('(') + 1:create_sql.rindex(')')]
+    items = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, ch in enumerate(body):
+        if quote:
+            # A doubled quote closes and reopens, which comes out the same
+            if ch == quote:
+                quote = None
+        elif ch in '"\'`':
+            quote = ch
+        elif ch == '[':
+            quote = ']'
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            items.append(body[start:i].strip())
+            start = i + 1
+    items.append(body[start:].strip())
+    return items
+
+
+def _sqlite_rebuild_without_column(cursor, real_name, remaining_cols, col_name):
+    """
+    SQLite's create/copy/drop/rename recipe for dropping a column, run as a
+    single transaction (one commit instead of one per statement) with
+    foreign key checks off. The new table keeps the original definitions
+    (PRIMARY KEY AUTOINCREMENT, NOT NULL, UNIQUE, DEFAULT...) from
+    sqlite_master, minus the dropped column and constraints naming it.
+    Rowids (and the AUTOINCREMENT sequence) are copied so row ids stay
+    stable, and the table's indexes that don't use the dropped column are
+    recreated.
+    """
+    table = quote_ident(real_name)
+    temp = quote_ident(f'{real_name}_temp')
+    cols_str = ', '.join([quote_ident(c['name']) for c in remaining_cols])
+    dropped = col_name.lower()
+    
+    # Has no effect inside a transaction, so switch it before starting one
+    cursor.execute('PRAGMA foreign_keys')
+    foreign_keys = cursor.fetchone()[0]
+    if foreign_keys:
+        cursor.execute('PRAGMA foreign_keys = OFF')
+    try:
+        with transaction.atomic():
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [real_name]
+            )
+            indexes = []
+            for index_name, index_sql in cursor.fetchall():
+                cursor.execute(f'PRAGMA index_info({quote_ident(index_name)})')
+                if all(info[2] != col_name for info in cursor.fetchall()):
+                    indexes.append(index_sql)
+            
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", [real_name])
+            create_sql = cursor.fetchone()[0]
+            # AUTOINCREMENT's high-water mark goes with the dropped table, so carry it over
+            sequence = None
+            if 'AUTOINCREMENT' in create_sql.upper():
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [real_name])
+                sequence = cursor.fetchone()
+            col_defs = []
+            for item in _sqlite_table_defs(create_sql):
+                match = SQLITE_DEF_NAME_RE.match(item)
+                if _sqlite_ident(match) == dropped:
+                    continue
+                # Table constraints (PRIMARY KEY (...), CHECK ...) go with the column they use
+                keyword = match.group(4)
+                if keyword and keyword.lower() in SQLITE_TABLE_CONSTRAINTS and any(
+                    _sqlite_ident(m) == dropped for m in SQLITE_IDENT_RE.finditer(item)
+                ):
+                    continue
+                col_defs.append(item)
+            
+            cursor.execute(f'CREATE TABLE {temp} ({", ".join(col_defs)})')
+            cursor.execute(f'INSERT INTO {temp} (rowid, {cols_str}) SELECT rowid, {cols_str} FROM {table}')
+            cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'ALTER TABLE {temp} RENAME TO {table}')
+            if sequence is not None:
+                cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [real_name])
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [real_name, sequence[0]])
+            for index_sql in indexes:
+                cursor.execute(index_sql)
+    finally:
+        if foreign_keys:
+            cursor.execute('PRAGMA foreign_keys = ON')
+
+
 class PublicTableColumnsView(APIView):
     """
     POST: Add a column to the table
@@ -534,11 +1002,6 @@ class PublicTableColumnsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, table_name):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({'success': False, 'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
-            
         col_name = request.data.get('name')
         col_type = request.data.get('type', 'TEXT').upper()
         
@@ -546,28 +1009,36 @@ class PublicTableColumnsView(APIView):
             return Response({'success': False, 'error': 'Column name is required'}, status=status.HTTP_400_BAD_REQUEST)
             
         # Validate column name 
-        if not col_name.isidentifier():
+        if not is_valid_identifier(col_name):
              return Response({'success': False, 'error': 'Invalid column name'}, status=status.HTTP_400_BAD_REQUEST)
+        if not is_valid_column_type(col_type):
+             return Response({'success': False, 'error': 'Invalid column type'}, status=status.HTTP_400_BAD_REQUEST)
              
-        # Check if already exists
-        existing_cols = [c['name'] for c in user_table.schema]
-        if col_name in existing_cols:
-             return Response({'success': False, 'error': 'Column already exists'}, status=status.HTTP_400_BAD_REQUEST)
-             
-        real_type = col_type
-        if connection.vendor != 'sqlite':
-            if real_type == 'BLOB': real_type = 'BYTEA'
-            elif real_type == 'DATETIME': real_type = 'TIMESTAMP'
-
-        sql = f'ALTER TABLE "{user_table.real_name}" ADD COLUMN "{col_name}" {real_type}'
+        real_type = column_type_sql(col_type)
         
         try:
-            with connection.cursor() as cursor:
-                cursor.execute(sql)
+            # DDL and stored schema change together or not at all
+            with transaction.atomic():
+                user_table = get_user_table_for_update(request.user, table_name)
+                if user_table is None:
+                    return Response({'success': False, 'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
                 
-            # Update Schema
-            user_table.schema.append({'name': col_name, 'type': col_type})
-            user_table.save(update_fields=['schema'])
+                # Check if already exists
+                existing_cols = [c['name'] for c in user_table.schema]
+                if col_name in existing_cols:
+                    return Response({'success': False, 'error': 'Column already exists'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                sql = f'ALTER TABLE {quote_ident(user_table.real_name)} ADD COLUMN {quote_ident(col_name)} {real_type}'
+                with connection.cursor() as cursor:
+                    limit_ddl_lock_wait(cursor)
+                    cursor.execute(sql)
+                    # Searches now cover one more column, the old search index is no use
+                    auto_index.drop_search_index(cursor, user_table.real_name, existing_cols)
+                
+                # Update Schema
+                new_col = {'name': col_name, 'type': col_type}
+                user_table.schema.append(new_col)
+                save_schema(user_table, SCHEMA_APPEND_SQL, [json.dumps([new_col])])
             
             log_api_activity(request.user, 'ADD_COLUMN', table_name, f'Added column "{col_name}" to "{table_name}"', request=request)
             
@@ -577,11 +1048,6 @@ class PublicTableColumnsView(APIView):
 
     def put(self, request, table_name):
         """Rename a column"""
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({'success': False, 'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
-        
         old_name = request.data.get('old_name')
         new_name = request.data.get('new_name')
         
@@ -589,34 +1055,41 @@ class PublicTableColumnsView(APIView):
             return Response({'success': False, 'error': 'old_name and new_name are required'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Validate new column name
-        if not new_name.isidentifier():
+        if not is_valid_identifier(new_name):
             return Response({'success': False, 'error': 'Invalid new column name'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if old column exists
-        existing_cols = {c['name']: c for c in user_table.schema}
-        if old_name not in existing_cols:
-            return Response({'success': False, 'error': f'Column "{old_name}" not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if new name already exists
-        if new_name in existing_cols and new_name != old_name:
-            return Response({'success': False, 'error': f'Column "{new_name}" already exists'}, status=status.HTTP_400_BAD_REQUEST)
-        
         try:
-            with connection.cursor() as cursor:
-                if connection.vendor == 'postgresql':
-                    sql = f'ALTER TABLE "{user_table.real_name}" RENAME COLUMN "{old_name}" TO "{new_name}"'
-                    cursor.execute(sql)
-                else:
-                    # SQLite supports RENAME COLUMN since version 3.25.0
-                    sql = f'ALTER TABLE "{user_table.real_name}" RENAME COLUMN "{old_name}" TO "{new_name}"'
-                    cursor.execute(sql)
-            
-            # Update schema
-            for col in user_table.schema:
-                if col['name'] == old_name:
-                    col['name'] = new_name
-                    break
-            user_table.save(update_fields=['schema'])
+            with transaction.atomic():
+                user_table = get_user_table_for_update(request.user, table_name)
+                if user_table is None:
+                    return Response({'success': False, 'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
+                
+                # Check if old column exists
+                existing_cols = {c['name']: c for c in user_table.schema}
+                if old_name not in existing_cols:
+                    return Response({'success': False, 'error': f'Column "{old_name}" not found'}, status=status.HTTP_404_NOT_FOUND)
+                
+                # Check if new name already exists
+                if new_name in existing_cols and new_name != old_name:
+                    return Response({'success': False, 'error': f'Column "{new_name}" already exists'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                with connection.cursor() as cursor:
+                    limit_ddl_lock_wait(cursor)
+                    if connection.vendor == 'postgresql':
+                        sql = f'ALTER TABLE {quote_ident(user_table.real_name)} RENAME COLUMN {quote_ident(old_name)} TO {quote_ident(new_name)}'
+                        cursor.execute(sql)
+                    else:
+                        # SQLite supports RENAME COLUMN since version 3.25.0
+                        sql = f'ALTER TABLE {quote_ident(user_table.real_name)} RENAME COLUMN {quote_ident(old_name)} TO {quote_ident(new_name)}'
+                        cursor.execute(sql)
+                    auto_index.drop_search_index(cursor, user_table.real_name, list(existing_cols))
+                
+                # Update schema
+                for col in user_table.schema:
+                    if col['name'] == old_name:
+                        col['name'] = new_name
+                        break
+                save_schema(user_table, SCHEMA_RENAME_SQL, [old_name, new_name])
             
             log_api_activity(request.user, 'RENAME_COLUMN', table_name, f'Renamed column "{old_name}" to "{new_name}" in "{table_name}"', request=request)
             
@@ -626,53 +1099,55 @@ class PublicTableColumnsView(APIView):
 
     def delete(self, request, table_name):
         """Delete a column"""
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({'success': False, 'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
-        
         col_name = request.data.get('name')
         
         if not col_name:
             return Response({'success': False, 'error': 'Column name is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if column exists
-        existing_cols = [c['name'] for c in user_table.schema]
-        if col_name not in existing_cols:
-            return Response({'success': False, 'error': f'Column "{col_name}" not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Prevent deleting last column
-        if len(existing_cols) <= 1:
-            return Response({'success': False, 'error': 'Cannot delete the last column'}, status=status.HTTP_400_BAD_REQUEST)
-        
         try:
+            rebuild = False
             with connection.cursor() as cursor:
-                if connection.vendor == 'postgresql':
-                    sql = f'ALTER TABLE "{user_table.real_name}" DROP COLUMN "{col_name}"'
-                    cursor.execute(sql)
-                else:
-                    # SQLite DROP COLUMN supported since 3.35.0
-                    # Try it first, fall back to table recreation if it fails
+                # DDL and stored schema change together or not at all
+                with transaction.atomic():
+                    user_table = get_user_table_for_update(request.user, table_name)
+                    if user_table is None:
+                        return Response({'success': False, 'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
+                    
+                    # Check if column exists
+                    existing_cols = [c['name'] for c in user_table.schema]
+                    if col_name not in existing_cols:
+                        return Response({'success': False, 'error': f'Column "{col_name}" not found'}, status=status.HTTP_404_NOT_FOUND)
+                    
+                    # Prevent deleting last column
+                    if len(existing_cols) <= 1:
+                        return Response({'success': False, 'error': 'Cannot delete the last column'}, status=status.HTTP_400_BAD_REQUEST)
+                    
+                    remaining_cols = [c for c in user_table.schema if c['name'] != col_name]
+                    sql = f'ALTER TABLE {quote_ident(user_table.real_name)} DROP COLUMN {quote_ident(col_name)}'
+                    limit_ddl_lock_wait(cursor)
+                    auto_index.drop_index(cursor, user_table.real_name, col_name)
                     try:
-                        sql = f'ALTER TABLE "{user_table.real_name}" DROP COLUMN "{col_name}"'
-                        cursor.execute(sql)
-                    except Exception:
-                        # Fallback: recreate table without the column (for older SQLite)
-                        remaining_cols = [c for c in user_table.schema if c['name'] != col_name]
-                        cols_str = ', '.join([f'"{c["name"]}"' for c in remaining_cols])
-                        
-                        # Create temp table, copy data, drop old, rename
-                        temp_name = f"{user_table.real_name}_temp"
-                        col_defs = ', '.join([f'"{c["name"]}" {c.get("type", "TEXT")}' for c in remaining_cols])
-                        
-                        cursor.execute(f'CREATE TABLE "{temp_name}" ({col_defs})')
-                        cursor.execute(f'INSERT INTO "{temp_name}" ({cols_str}) SELECT {cols_str} FROM "{user_table.real_name}"')
-                        cursor.execute(f'DROP TABLE "{user_table.real_name}"')
-                        cursor.execute(f'ALTER TABLE "{temp_name}" RENAME TO "{user_table.real_name}"')
-            
-            # Update schema
-            user_table.schema = [c for c in user_table.schema if c['name'] != col_name]
-            user_table.save(update_fields=['schema'])
+                        # SQLite DROP COLUMN supported since 3.35.0
+                        with transaction.atomic():
+                            cursor.execute(sql)
+                    except DatabaseError:
+                        if connection.vendor == 'postgresql':
+                            raise
+                        rebuild = True
+                    else:
+                        user_table.schema = remaining_cols
+                        save_schema(user_table, SCHEMA_REMOVE_SQL, [col_name])
+                
+                if rebuild:
+                    # Fallback: recreate table without the column (older SQLite,
+                    # or the column is indexed). It toggles PRAGMA foreign_keys,
+                    # which has to happen outside a transaction.
+                    _sqlite_rebuild_without_column(cursor, user_table.real_name, remaining_cols, col_name)
+                    with transaction.atomic():
+                        # Re-read: the schema may have changed since the block above
+                        user_table = get_user_table_for_update(request.user, table_name)
+                        user_table.schema = [c for c in user_table.schema if c['name'] != col_name]
+                        save_schema(user_table, SCHEMA_REMOVE_SQL, [col_name])
             
             log_api_activity(request.user, 'DELETE_COLUMN', table_name, f'Deleted column "{col_name}" from "{table_name}"', request=request)
             
@@ -693,23 +1168,41 @@ class APIKeyListCreateView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        keys = APIKey.objects.filter(user=request.user)
-        result = []
+        # Plain dicts, no model instances; the renderer formats the datetimes
+        keys = APIKey.objects.filter(user=request.user).order_by('-created_at').values(
+            'id', 'name', 'key_prefix', 'created_at', 'last_used_at', 'is_active'
+        )
         
-        for key in keys:
-            result.append({
-                'id': key.id,
-                'name': key.name,
-                'key_prefix': key.key_prefix,
-                'created_at': key.created_at.isoformat(),
-                'last_used_at': key.last_used_at.isoformat() if key.last_used_at else None,
-                'is_active': key.is_active,
+        # ?page= / ?limit= fetch one page; without them every key is returned
+        if 'page' not in request.query_params and 'limit' not in request.query_params:
+            result = list(keys)
+            return Response({
+                'success': True,
+                'keys': result,
+                'count': len(result),
             })
         
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            limit = min(max(int(request.query_params.get('limit', API_KEY_PAGE_SIZE)), 1), 100)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'page and limit must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        offset = (page - 1) * limit
+        # One extra row tells whether there is a next page
+        result = list(keys[offset:offset + limit + 1])
+        has_next = len(result) > limit
+        result = result[:limit]
         return Response({
             'success': True,
             'keys': result,
             'count': len(result),
+            'page': page,
+            'next': page + 1 if has_next else None,
+            'prev': page - 1 if page > 1 else None,
         })
     
     def post(self, request):
@@ -742,26 +1235,27 @@ class APIKeyDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def delete(self, request, key_id):
-        try:
-            api_key = APIKey.objects.get(id=key_id, user=request.user)
-            api_key.delete()
-            
-            return Response({
-                'success': True,
-                'message': 'API key deleted'
-            })
-        except APIKey.DoesNotExist:
+        # post_delete still fires per key, dropping it from the auth cache
+        deleted, _ = APIKey.objects.filter(id=key_id, user=request.user).delete()
+        if not deleted:
             return Response({
                 'success': False,
                 'error': 'API key not found'
             }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'message': 'API key deleted'
+        })
     
     def patch(self, request, key_id):
         try:
             api_key = APIKey.objects.get(id=key_id, user=request.user)
             
+            # The SELECT gives post_save the key_hash to invalidate; skip
+            # the UPDATE when nothing changes
             is_active = request.data.get('is_active')
-            if is_active is not None:
+            if is_active is not None and is_active != api_key.is_active:
                 api_key.is_active = is_active
                 api_key.save(update_fields=['is_active'])
             
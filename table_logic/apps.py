@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TableLogicConfig(AppConfig):
     name = 'table_logic'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,248 @@
+"""
+Index advisor for user tables.
+
+User tables are created without indexes, so every ?col=... filter on the
+public API is a full scan. The rows view records which columns it filters
+on, and a daemon thread periodically indexes the columns that keep coming
+up (CREATE INDEX CONCURRENTLY on Postgres, CREATE INDEX on SQLite).
+On Postgres, frequently searched tables also get a pg_trgm GIN index on
+the search expression (queries.search_expr_sql), if pg_trgm is installed.
+Set AUTO_INDEX_THRESHOLD = 0 to turn this off.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from . import activity
+from .models import UserTable
+from .queries import quote_ident, search_expr_sql
+
+
+logger = logging.getLogger(__name__)
+
+THRESHOLD = getattr(settings, 'AUTO_INDEX_THRESHOLD', 100)  # filtered requests per column
+INTERVAL = getattr(settings, 'AUTO_INDEX_INTERVAL', 60)  # seconds between checks
+# Indexes across a user's tables, counted from the catalog so it holds
+# across processes and restarts
+MAX_PER_USER = getattr(settings, 'AUTO_INDEX_MAX_PER_USER', 20)
+
+# (user_id, table_name, real_name, column) -> filtered requests seen; for
+# searches the last item is the tuple of columns searched instead. Counts
+# still under THRESHOLD are halved on every run, so columns that stop being
+# filtered on fade out instead of piling up.
+_hits = Counter()
+# Keys this process has stopped counting: indexed (by any process, the
+# catalog says) or given up on
+_done = set()
+_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def record(user_id, table_name, real_name, columns):
+    """Count one filtered request on `columns` of a user table"""
+    if THRESHOLD <= 0 or not columns:
+        return
+    _ensure_worker()
+    with _lock:
+        for col in columns:
+            key = (user_id, table_name, real_name, col)
+            if key not in _done:
+                _hits[key] += 1
+
+
+def record_search(user_id, table_name, real_name, columns):
+    """Count one ?search= request over `columns` (Postgres only)"""
+    if THRESHOLD <= 0 or not columns or connection.vendor != 'postgresql':
+        return
+    _ensure_worker()
+    key = (user_id, table_name, real_name, tuple(columns))
+    with _lock:
+        if key not in _done:
+            _hits[key] += 1
+
+
+def index_name(real_name, col):
+    digest = hashlib.md5(f'{real_name}\x00{col}'.encode()).hexdigest()[:16]
+    return f'auto_{digest}'
+
+
+def search_index_name(real_name, columns):
+    digest = hashlib.md5('\x00'.join((real_name, *columns)).encode()).hexdigest()[:16]
+    return f'auto_search_{digest}'
+
+
+def drop_index(cursor, real_name, col):
+    """
+    Drop the advisor's index on a column about to be dropped (SQLite refuses
+    to DROP COLUMN an indexed column)
+    """
+    cursor.execute(f'DROP INDEX IF EXISTS {quote_ident(index_name(real_name, col))}')
+    _forget(lambda key: key[2] == real_name and key[3] == col)
+
+
+def drop_search_index(cursor, real_name, columns):
+    """
+    Drop the search index built for the table's old column list (call when
+    columns are added/renamed/dropped: searches then use a new expression)
+    """
+    if connection.vendor == 'postgresql':
+        cursor.execute(f'DROP INDEX IF EXISTS {quote_ident(search_index_name(real_name, columns))}')
+    columns = tuple(columns)
+    _forget(lambda key: key[2] == real_name and key[3] == columns)
+
+
+def forget_table(real_name):
+    """Drop what's been counted or indexed for a table being dropped"""
+    _forget(lambda key: key[2] == real_name)
+
+
+def _forget(matches):
+    # A column dropped and added again starts over
+    with _lock:
+        for key in [key for key in _hits if matches(key)]:
+            del _hits[key]
+        _done.difference_update([key for key in _done if matches(key)])
+
+
+def run_once():
+    """Index every column that has crossed the threshold since the last run"""
+    with _lock:
+        due = []
+        for key, hits in list(_hits.items()):
+            if hits < THRESHOLD:
+                if hits > 1:
+                    _hits[key] = hits // 2
+                else:
+                    del _hits[key]
+                continue
+            del _hits[key]
+            _done.add(key)
+            due.append(key)
+
+    if not due:
+        return
+    close_old_connections()
+    existing = {}  # user_id -> names of the advisor's indexes on their tables
+    for key in due:
+        user_id, table_name, real_name, col = key
+        if user_id not in existing:
+            existing[user_id] = _existing_indexes(user_id)
+        names = existing[user_id]
+        name = search_index_name(real_name, col) if isinstance(col, tuple) else index_name(real_name, col)
+        if name in names:
+            # Built by another process, or before a restart
+            continue
+        if len(names) >= MAX_PER_USER:
+            logger.info('User %s has %d auto indexes, not indexing %s (%s)', user_id, len(names), real_name, col)
+            # Counted again next time, in case a slot frees up
+            with _lock:
+                _done.discard(key)
+            continue
+        if _create_index(*key):
+            names.add(name)
+
+
+def _existing_indexes(user_id):
+    """Names of the advisor's indexes (auto_...) on the user's tables, from the catalog"""
+    real_names = list(UserTable.objects.filter(user_id=user_id).values_list('real_name', flat=True))
+    if not real_names:
+        return set()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() "
+                "AND tablename = ANY(%s) AND indexname LIKE 'auto\\_%%' ESCAPE '\\'",
+                [real_names],
+            )
+        else:
+            placeholders = ', '.join(['%s'] * len(real_names))
+            cursor.execute(
+                f"SELECT name FROM sqlite_master WHERE type = 'index' "
+                f"AND tbl_name IN ({placeholders}) AND name LIKE 'auto\\_%%' ESCAPE '\\'",
+                real_names,
+            )
+        return {name for name, in cursor.fetchall()}
+
+
+def _has_trigram():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def _create_index(user_id, table_name, real_name, col):
+    """Create the index for one key, True if it was created"""
+    if connection.vendor == 'postgresql':
+        # CONCURRENTLY can't run in a transaction; the thread's connection is in autocommit
+        create = 'CREATE INDEX CONCURRENTLY IF NOT EXISTS'
+    else:
+        create = 'CREATE INDEX IF NOT EXISTS'
+    
+    if isinstance(col, tuple):
+        name = search_index_name(real_name, col)
+        sql = (
+            f'{create} {quote_ident(name)} ON {quote_ident(real_name)} '
+            f'USING GIN (({search_expr_sql(col)}) gin_trgm_ops)'
+        )
+        description = f'Indexed "{table_name}" for search (frequently searched)'
+        metadata = {'source': 'api', 'search': True, 'index': name}
+    else:
+        name = index_name(real_name, col)
+        sql = f'{create} {quote_ident(name)} ON {quote_ident(real_name)} ({quote_ident(col)})'
+        description = f'Indexed column "{col}" of "{table_name}" (frequently filtered)'
+        metadata = {'source': 'api', 'column': col, 'index': name}
+    
+    try:
+        if isinstance(col, tuple) and not _has_trigram():
+            logger.info('pg_trgm is not installed, not indexing searches on %s', real_name)
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+    except Exception:
+        # Table/column dropped or renamed since the requests were counted, or
+        # (searches) a column whose text form isn't immutable, e.g. a timestamp
+        logger.exception('Failed to create index %s on %s (%s)', name, real_name, col)
+        if connection.vendor == 'postgresql':
+            # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP INDEX IF EXISTS {quote_ident(name)}')
+            except Exception:
+                pass
+        return False
+    activity.enqueue(
+        user_id=user_id,
+        action='AUTO_INDEX',
+        table_name=table_name,
+        description=description,
+        metadata=metadata,
+        ip_address=None
+    )
+    return True
+
+
+def _run():
+    while True:
+        time.sleep(INTERVAL)
+        try:
+            run_once()
+        except Exception:
+            logger.exception('Index advisor run failed')
+
+
+def _ensure_worker():
+    """Start the advisor thread on first use (and again in forked workers)"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run, name='auto-index', daemon=True)
+        _worker.start()
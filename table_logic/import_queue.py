@@ -0,0 +1,134 @@
+"""
+Background writer for imports posted with "wait": false.
+
+The import view checks the rows and queues them here, answering 202 at
+once. A daemon thread drains the queue every IMPORT_QUEUE_FLUSH_INTERVAL
+(sooner once IMPORT_QUEUE_BATCH_ROWS rows are waiting) and inserts what
+each table got in one transaction, so many small imports share batches
+and a commit. Rows the database rejects are logged, not reported back,
+and rows still queued when a process is killed are lost (a normal
+shutdown flushes them).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .queries import insert_rows, invalidate_row_count
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'IMPORT_QUEUE_FLUSH_INTERVAL', 0.2)  # seconds
+BATCH_ROWS = getattr(settings, 'IMPORT_QUEUE_BATCH_ROWS', 10000)
+# Bounded so a stalled database can't grow the backlog without limit
+QUEUE_SIZE = getattr(settings, 'IMPORT_QUEUE_SIZE', 1000)  # queued imports
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_write_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(real_name, runs):
+    """
+    Queue checked rows for a user table, as runs of
+    (columns, [(row index, values), ...]) like queries.insert_rows takes
+    """
+    _ensure_worker()
+    try:
+        _queue.put_nowait((real_name, runs))
+    except queue.Full:
+        # Writer can't keep up - insert synchronously instead
+        _write([(real_name, runs)], task_done=False)
+
+
+def flush():
+    """Write everything queued so far and wait for the worker to catch up"""
+    while True:
+        batch = []
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            break
+        _write(batch)
+    _queue.join()
+
+
+def _row_count(item):
+    return sum(len(rows) for _, rows in item[1])
+
+
+def _write(batch, task_done=True):
+    # Group by table, merging consecutive runs that share a column set
+    tables = {}
+    for real_name, runs in batch:
+        merged = tables.setdefault(real_name, [])
+        for columns, rows in runs:
+            if merged and merged[-1][0] == columns:
+                merged[-1][1].extend(rows)
+            else:
+                merged.append((columns, list(rows)))
+
+    with _write_lock:
+        try:
+            close_old_connections()
+            for real_name, runs in tables.items():
+                try:
+                    with transaction.atomic():
+                        with connection.cursor() as cursor:
+                            inserted, errors = insert_rows(cursor, real_name, runs, max_errors=1)
+                except Exception:
+                    logger.exception('Failed to write queued import into %s', real_name)
+                    continue
+                if inserted:
+                    invalidate_row_count(real_name)
+                if errors:
+                    logger.warning(
+                        'Queued import into %s: %d rows rejected (first: %s)',
+                        real_name, sum(len(rows) for _, rows in runs) - inserted, errors[0][1]
+                    )
+        finally:
+            if task_done:
+                for _ in batch:
+                    _queue.task_done()
+
+
+def _run():
+    while True:
+        batch = [_queue.get()]
+        row_count = _row_count(batch[0])
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while row_count < BATCH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            row_count += _row_count(item)
+        _write(batch)
+
+
+def _ensure_worker():
+    """Start the writer thread on first use (and again in forked workers)"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        first_start = _worker is None
+        _worker = threading.Thread(target=_run, name='import-writer', daemon=True)
+        _worker.start()
+        if first_start:
+            atexit.register(flush)
@@ -0,0 +1,77 @@
+"""
+Bloom filter over the active API key hashes.
+
+An X-API-Key that isn't in the cache would normally cost a SELECT; keys
+known not to exist are rejected here first, so scanners sending random
+keys never reach the database. Each process keeps its own filter and
+rebuilds it when the shared generation (in the cache) changes, which
+happens whenever a key is created or reactivated.
+False positives just fall through to the normal DB lookup.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Off unless the cache is shared (Redis) - see API_KEY_FILTER in settings
+ENABLED = getattr(settings, 'API_KEY_FILTER', False)
+
+GENERATION_KEY = 'apikey:filter-generation'
+
+BITS_PER_KEY = 20   # ~1e-4 false positive rate with 14 probes
+PROBES = 14
+MIN_BITS = 1 << 16
+
+_lock = threading.Lock()
+_filter = (None, 0)  # (bit array, number of bits)
+_generation = None
+
+
+def _positions(key_hash, num_bits):
+    # key_hash is a SHA-256 hex digest, already uniformly random: use
+    # overlapping 32-bit windows of it as the probe positions
+    return [int(key_hash[i * 4:i * 4 + 8], 16) % num_bits for i in range(PROBES)]
+
+
+def _current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _rebuild(generation):
+    global _filter, _generation
+    from .models import APIKey
+
+    hashes = list(APIKey.objects.filter(is_active=True).values_list('key_hash', flat=True))
+    num_bits = max(MIN_BITS, len(hashes) * BITS_PER_KEY)
+    bits = bytearray((num_bits + 7) // 8)
+    for key_hash in hashes:
+        for pos in _positions(key_hash, num_bits):
+            bits[pos >> 3] |= 1 << (pos & 7)
+    _filter = (bits, num_bits)
+    _generation = generation
+
+
+def might_exist(key_hash):
+    """False only if no active key has this hash"""
+    if not ENABLED:
+        return True
+    # Read the generation before loading keys, so a key committed
+    # meanwhile bumps it again and forces another rebuild
+    generation = _current_generation()
+    if generation != _generation:
+        with _lock:
+            if generation != _generation:
+                _rebuild(generation)
+    bits, num_bits = _filter
+    return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in _positions(key_hash, num_bits))
+
+
+def invalidate():
+    """Make every process rebuild its filter (call after a key is committed)"""
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-14 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('table_logic', '0003_alter_activitylog_options_apikey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', '-created_at'], name='activity_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apikey',
+            index=models.Index(fields=['user', '-created_at'], name='apikey_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-14 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('table_logic', '0004_activity_apikey_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='activitylog',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='apikey',
+            options={'verbose_name': 'API Key', 'verbose_name_plural': 'API Keys'},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-14 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('table_logic', '0005_drop_default_ordering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'action', '-created_at'], name='activity_user_action_idx'),
+        ),
+    ]
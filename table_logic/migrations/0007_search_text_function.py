@@ -0,0 +1,43 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+# IMMUTABLE stand-in for concat_ws(chr(31), ...), which Postgres marks STABLE
+# and so refuses in an index expression. Used by queries.search_expr_sql.
+CREATE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION myowndb_search_text(VARIADIC parts text[])
+RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT array_to_string(parts, chr(31)) $$
+"""
+
+DROP_FUNCTION_SQL = 'DROP FUNCTION IF EXISTS myowndb_search_text(VARIADIC text[])'
+
+
+def create_search_function(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_FUNCTION_SQL)
+    # Trigram indexes for searches (see auto_index). pg_trgm is a trusted
+    # extension on Postgres 13+; without the privilege searches just stay
+    # unindexed
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        pass
+
+
+def drop_search_function(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_FUNCTION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('table_logic', '0006_activity_user_action_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_function, drop_search_function),
+    ]
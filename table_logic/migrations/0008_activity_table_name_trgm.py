@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# ?table= on the activity feed is table_name__icontains, which Postgres runs
+# as UPPER("table_name"::text) LIKE UPPER(%s): index exactly that expression.
+# Needs pg_trgm (0007 tries to install it); skipped without it.
+INDEX_NAME = 'activity_table_name_trgm_idx'
+
+CREATE_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON table_logic_activitylog
+USING GIN ((UPPER("table_name"::text)) gin_trgm_ops)
+"""
+
+DROP_INDEX_SQL = f'DROP INDEX IF EXISTS {INDEX_NAME}'
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('table_logic', '0007_search_text_function'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,7 +1,34 @@
+import hashlib
+import secrets
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User  # ← User comes from here!
+from django.core.cache import cache
 from django.utils import timezone
 
+from authentication_app.backends import get_cached_user
+
+from . import key_filter
+
+
+# Validated keys are cached by hash so repeat calls skip the DB. Only the key's
+# own fields are stored; the user comes from the shared user cache, which is
+# dropped whenever the user changes. Off unless the cache is shared (Redis) -
+# see API_KEY_CACHE in settings.
+API_KEY_CACHE = getattr(settings, 'API_KEY_CACHE', False)
+API_KEY_CACHE_TIMEOUT = 300  # seconds
+
+# "sk_" + 64 hex chars, see APIKey.generate_key
+API_KEY_LENGTH = 67
+
+# last_used_at is written at most once per key per interval
+LAST_USED_INTERVAL = 60  # seconds
+
+
+def api_key_cache_key(key_hash):
+    return f'apikey:{key_hash}'
+
 
 class UserTable(models.Model):  # Fixed: models.Model (capital M)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -12,6 +39,7 @@ class UserTable(models.Model):  # Fixed: models.Model (capital M)
     
     class Meta:
         # Ensure same user can't have duplicate table names
+        # (the unique index also serves every user + table_name lookup)
         unique_together = ['user', 'table_name']
 
     def __str__(self):
@@ -24,10 +52,17 @@ class ActivityLog(models.Model):
     description = models.TextField()                # Human-readable description
     metadata = models.JSONField(null=True)          # Extra data (row_id, old/new values)
     ip_address = models.GenericIPAddressField(null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Stamped when the entry is queued, not when the writer inserts it
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
-        ordering = ['-created_at']
+        # No default ordering: views that list logs sort explicitly
+        indexes = [
+            # Activity feed / stats: one user's logs, newest first
+            models.Index(fields=['user', '-created_at'], name='activity_user_created_idx'),
+            # Activity feed filtered by ?action=
+            models.Index(fields=['user', 'action', '-created_at'], name='activity_user_action_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} on {self.table_name} by {self.user.username}"
@@ -38,9 +73,6 @@ class APIKey(models.Model):
     API Key for secure external access to user's data.
     The actual key is only shown ONCE when created - we store the hash.
     """
-    import secrets
-    import hashlib
-    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_keys')
     name = models.CharField(max_length=100)              # e.g., "My Python App", "Production"
     key_prefix = models.CharField(max_length=8)          # First 8 chars of key (for identification)
@@ -50,9 +82,13 @@ class APIKey(models.Model):
     is_active = models.BooleanField(default=True)
     
     class Meta:
-        ordering = ['-created_at']
+        # No default ordering, so auth lookups carry no ORDER BY
         verbose_name = 'API Key'
         verbose_name_plural = 'API Keys'
+        indexes = [
+            # Key list: one user's keys, newest first
+            models.Index(fields=['user', '-created_at'], name='apikey_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.key_prefix}...)"
@@ -60,7 +96,6 @@ class APIKey(models.Model):
     @classmethod
     def generate_key(cls):
         """Generate a new random API key with sk_ prefix"""
-        import secrets
         # 32 bytes = 64 hex chars, plus prefix = 67 chars total
         raw_key = f"sk_{secrets.token_hex(32)}"
         return raw_key
@@ -68,7 +103,6 @@ class APIKey(models.Model):
     @classmethod
     def hash_key(cls, raw_key):
         """Hash a raw key using SHA-256"""
-        import hashlib
         return hashlib.sha256(raw_key.encode()).hexdigest()
     
     @classmethod
@@ -95,18 +129,37 @@ class APIKey(models.Model):
         Authenticate a raw API key.
         Returns the APIKey object if valid, None otherwise.
         """
-        if not raw_key or not raw_key.startswith('sk_'):
+        # Malformed keys never get hashed or looked up
+        if not isinstance(raw_key, str) or len(raw_key) != API_KEY_LENGTH or not raw_key.startswith('sk_'):
             return None
         
         key_hash = cls.hash_key(raw_key)
-        try:
-            api_key = cls.objects.select_related('user').get(
-                key_hash=key_hash,
-                is_active=True
-            )
-            # Update last used timestamp
-            api_key.last_used_at = timezone.now()
-            api_key.save(update_fields=['last_used_at'])
-            return api_key
-        except cls.DoesNotExist:
-            return None        
\ No newline at end of file
+        cache_key = api_key_cache_key(key_hash)
+        cached = cache.get(cache_key) if API_KEY_CACHE else None
+        if cached is None:
+            # Unknown keys (scanners, typos) are turned away without a query
+            if not key_filter.might_exist(key_hash):
+                return None
+            # Just the key's own columns; the user comes from the user cache
+            cached = cls.objects.filter(key_hash=key_hash, is_active=True).values(
+                'id', 'user_id', 'name', 'key_prefix'
+            ).first()
+            if cached is None:
+                return None
+            if API_KEY_CACHE:
+                cache.set(cache_key, cached, API_KEY_CACHE_TIMEOUT)
+        
+        user = get_cached_user(cached['user_id'])
+        if user is None:
+            return None
+        api_key = cls(key_hash=key_hash, is_active=True, **cached)
+        api_key.user = user
+        
+        # Update last used timestamp, throttled: cache.add() only succeeds
+        # for the first request per interval (across workers on Redis).
+        # update() sends no post_save, so the cached key stays valid.
+        now = timezone.now()
+        if cache.add(f'apikey:used:{api_key.pk}', 1, LAST_USED_INTERVAL):
+            cls.objects.filter(pk=api_key.pk).update(last_used_at=now)
+        api_key.last_used_at = now
+        return api_key        
\ No newline at end of file
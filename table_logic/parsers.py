@@ -0,0 +1,27 @@
+"""
+orjson-backed JSON parser for DRF.
+Imports and bulk inserts post large row lists; orjson parses them several
+times faster than the stdlib json module DRF uses by default.
+"""
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding') or settings.DEFAULT_CHARSET
+        try:
+            data = stream.read()
+            if encoding.lower() not in ('utf-8', 'utf8'):
+                # orjson reads UTF-8 only; bytes.decode() also refuses
+                # non-text codecs such as bz2_codec
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except LookupError:
+            raise ParseError(f'Unsupported charset "{encoding}" in request Content-Type header.')
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,608 @@
+"""
+Raw SQL helpers shared by the dashboard and public API views.
+User tables are plain database tables, so these talk to the cursor directly.
+"""
+import base64
+import json
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import UserTable
+
+
+# SQLite caps a compound SELECT at 500 terms, stay well under it
+COUNT_BATCH_SIZE = 200
+
+# Row counts are cached briefly and dropped whenever rows are added/removed
+# (only with TABLE_CACHE: the drop has to reach every process)
+ROW_COUNT_TIMEOUT = 60
+
+# Postgres tables the planner puts at this many rows or more report its
+# estimate (pg_class.reltuples) instead of an exact COUNT(*), a full scan.
+# Filtered totals are always exact.
+ROW_COUNT_ESTIMATE_MIN = 100000
+
+# (user, table_name) -> real_name/schema, dropped whenever the UserTable changes.
+# Off unless the cache is shared (Redis) - see TABLE_CACHE in settings.
+TABLE_CACHE = getattr(settings, 'TABLE_CACHE', False)
+USER_TABLE_TIMEOUT = 300
+
+# user -> list of their tables, dropped whenever one of them changes (also
+# only with TABLE_CACHE)
+TABLE_LIST_TIMEOUT = 600
+
+# Bind parameters per multi-row INSERT (Postgres allows 65535)
+MAX_INSERT_PARAMS = 30000
+
+# Rows per executemany() / multi-row INSERT in insert_rows()
+INSERT_BATCH_SIZE = 1000
+
+# Postgres: commit imports without waiting for the WAL flush (see settings)
+IMPORT_ASYNC_COMMIT = getattr(settings, 'IMPORT_ASYNC_COMMIT', False)
+
+# Postgres: how long column DDL waits for its table lock before giving up (ms)
+DDL_LOCK_TIMEOUT = getattr(settings, 'DDL_LOCK_TIMEOUT', 5000)
+
+
+# Names accepted for new tables/columns: ASCII only, within Postgres' 63 byte limit
+IDENTIFIER_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]{0,62}')
+
+# Column types accepted in DDL, e.g. TEXT, DOUBLE PRECISION, VARCHAR(255)
+COLUMN_TYPE_RE = re.compile(r'[A-Z]+( [A-Z]+)*( ?\(\d+( ?, ?\d+)?\))?')
+
+
+# ============================================
+# IDENTIFIERS
+# ============================================
+# Table/column names can't be bound as parameters, so every one that goes
+# into SQL text passes through quote_ident. New names are also checked
+# against IDENTIFIER_RE where they enter the API.
+
+def is_valid_identifier(name):
+    return isinstance(name, str) and IDENTIFIER_RE.fullmatch(name) is not None
+
+
+def is_valid_column_type(col_type):
+    return isinstance(col_type, str) and COLUMN_TYPE_RE.fullmatch(col_type) is not None
+
+
+# Values that switch on a column flag (pk/notnull/unique): the dashboard
+# form may send booleans or strings. 1 is covered by True (1 == True).
+TRUTHY = frozenset([True, 'true', 'True', '1'])
+
+
+def is_flag_set(value):
+    try:
+        return value in TRUTHY
+    except TypeError:
+        # Unhashable, e.g. a list
+        return False
+
+
+# Column types that need another name outside SQLite
+TYPE_MAPS = {
+    'sqlite': {},
+    'postgresql': {'BLOB': 'BYTEA', 'DATETIME': 'TIMESTAMP'},
+}
+DEFAULT_TYPE_MAP = TYPE_MAPS['postgresql']
+
+
+def column_type_sql(col_type):
+    """Backend type name for a schema column type (BLOB -> BYTEA on Postgres, ...)"""
+    return TYPE_MAPS.get(connection.vendor, DEFAULT_TYPE_MAP).get(col_type, col_type)
+
+
+@lru_cache(maxsize=4096)
+def quote_ident(name):
+    """Double-quoted identifier with embedded quotes escaped (works on SQLite and Postgres)"""
+    if '\x00' in name:
+        raise ValueError('Identifiers cannot contain NUL characters')
+    return '"' + name.replace('"', '""') + '"'
+
+
+# ============================================
+# SQL TEXT
+# ============================================
+# Statement text is cached per table/shape and values are always bound as
+# parameters, so identical requests send identical SQL and hit the
+# driver's statement cache instead of being re-parsed.
+
+@lru_cache(maxsize=4096)
+def count_sql(real_name, where_sql=''):
+    return f'SELECT COUNT(*) FROM {quote_ident(real_name)} {where_sql}'.rstrip()
+
+
+@lru_cache(maxsize=4096)
+def select_page_sql(real_name, where_sql='', order_clause='', with_rowid=True):
+    """SELECT with rowid (unless with_rowid=False); bind [*where_params, limit, offset]"""
+    select_list = '*, rowid' if with_rowid else '*'
+    return f'SELECT {select_list} FROM {quote_ident(real_name)} {where_sql} {order_clause} LIMIT %s OFFSET %s'
+
+
+@lru_cache(maxsize=4096)
+def select_page_with_total_sql(real_name, where_sql='', order_clause='', with_rowid=True):
+    """
+    select_page_sql plus a trailing COUNT(*) OVER () column, so a filtered
+    page and its total come back in one statement. Bind [*where_params, limit, offset]
+    """
+    select_list = '*, rowid' if with_rowid else '*'
+    return (
+        f'SELECT {select_list}, COUNT(*) OVER () FROM {quote_ident(real_name)} {where_sql} {order_clause} '
+        f'LIMIT %s OFFSET %s'
+    )
+
+
+@lru_cache(maxsize=4096)
+def select_keyset_sql(real_name, where_sql, order_clause, with_rowid=True):
+    """SELECT with rowid (unless with_rowid=False) for keyset pages; bind [*where_params, limit]"""
+    select_list = '*, rowid' if with_rowid else '*'
+    return f'SELECT {select_list} FROM {quote_ident(real_name)} {where_sql} {order_clause} LIMIT %s'
+
+
+@lru_cache(maxsize=4096)
+def search_expr_sql(columns):
+    """
+    All of a row's columns as one text value, for search on Postgres.
+    myowndb_search_text() (migration 0007) is an IMMUTABLE concat_ws with
+    a chr(31) separator, so a match can't span two columns and a pg_trgm
+    GIN index on this exact expression can serve `... ILIKE '%term%'`.
+    """
+    concat = ', '.join(f'{quote_ident(col)}::text' for col in columns)
+    return f'myowndb_search_text({concat})'
+
+
+@lru_cache(maxsize=4096)
+def like_where_sql(search_columns=(), filter_columns=(), vendor='sqlite'):
+    """
+    WHERE for a substring search across `search_columns` (any may match)
+    and per-column substring filters on `filter_columns` (all must match).
+    Bind the search '%value%' once on Postgres (one search_expr_sql match),
+    once per search column elsewhere, then one '%value%' per filter column
+    """
+    conditions = []
+    if search_columns and vendor == 'postgresql':
+        conditions.append(f'{search_expr_sql(search_columns)} ILIKE %s')
+    elif search_columns:
+        search = ' OR '.join(f'CAST({quote_ident(col)} AS TEXT) LIKE %s' for col in search_columns)
+        conditions.append(f'({search})')
+    conditions.extend(f'{quote_ident(col)} LIKE %s' for col in filter_columns)
+    return 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+
+@lru_cache(maxsize=4096)
+def insert_sql(real_name, columns, returning=None):
+    """INSERT for a tuple of column names; bind values in the same order"""
+    columns_str = ', '.join(map(quote_ident, columns))
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = f'INSERT INTO {quote_ident(real_name)} ({columns_str}) VALUES ({placeholders})'
+    if returning:
+        sql += f' RETURNING {quote_ident(returning)}'
+    return sql
+
+
+@lru_cache(maxsize=1024)
+def insert_many_sql(real_name, columns, row_count, returning=None):
+    """Multi-row INSERT; bind the rows' values flattened in column order"""
+    columns_str = ', '.join(map(quote_ident, columns))
+    row_placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    sql = f'INSERT INTO {quote_ident(real_name)} ({columns_str}) VALUES ' + ', '.join([row_placeholders] * row_count)
+    if returning:
+        sql += f' RETURNING {quote_ident(returning)}'
+    return sql
+
+
+@lru_cache(maxsize=4096)
+def update_by_rowid_sql(real_name, columns):
+    """UPDATE one row; bind [*values in column order, rowid]"""
+    set_clause = ', '.join(f'{quote_ident(col)} = %s' for col in columns)
+    return f'UPDATE {quote_ident(real_name)} SET {set_clause} WHERE rowid = %s'
+
+
+@lru_cache(maxsize=4096)
+def update_by_key_sql(real_name, columns, key_col):
+    """UPDATE rows by a key column (e.g. the schema's pk); bind [*values in column order, key]"""
+    set_clause = ', '.join(f'{quote_ident(col)} = %s' for col in columns)
+    return f'UPDATE {quote_ident(real_name)} SET {set_clause} WHERE {quote_ident(key_col)} = %s'
+
+
+@lru_cache(maxsize=4096)
+def select_by_rowid_sql(real_name, fields=None):
+    """One row with rowid; `fields` is an optional tuple of columns to return instead of *"""
+    select_list = ', '.join(map(quote_ident, fields)) if fields else '*'
+    return f'SELECT {select_list}, rowid FROM {quote_ident(real_name)} WHERE rowid = %s'
+
+
+@lru_cache(maxsize=4096)
+def select_by_key_sql(real_name, key_col, fields=None):
+    """One row by a key column (e.g. the schema's pk); `fields` as for select_by_rowid_sql, the key is always included"""
+    if fields and key_col not in fields:
+        fields = (*fields, key_col)
+    select_list = ', '.join(map(quote_ident, fields)) if fields else '*'
+    return f'SELECT {select_list} FROM {quote_ident(real_name)} WHERE {quote_ident(key_col)} = %s'
+
+
+@lru_cache(maxsize=4096)
+def delete_by_rowid_sql(real_name):
+    return f'DELETE FROM {quote_ident(real_name)} WHERE rowid = %s'
+
+
+@lru_cache(maxsize=4096)
+def delete_by_key_sql(real_name, key_col):
+    return f'DELETE FROM {quote_ident(real_name)} WHERE {quote_ident(key_col)} = %s'
+
+
+# ============================================
+# BULK INSERTS
+# ============================================
+
+def insert_rows(cursor, real_name, runs, max_errors=None):
+    """
+    Insert runs of rows, each run being (columns, [(row index, values), ...]),
+    in batches: one multi-row INSERT per batch on Postgres, an executemany
+    elsewhere. A batch the database rejects is split in halves until the
+    bad rows are isolated, so they don't sink the rest. Call inside
+    transaction.atomic().
+    Returns (rows inserted, [(row index, error message), ...]) with at most
+    `max_errors` errors kept; every row not inserted was rejected.
+    """
+    inserted = 0
+    errors = []
+    multi_row = connection.vendor == 'postgresql'
+    if multi_row and IMPORT_ASYNC_COMMIT:
+        # Only for the enclosing transaction
+        cursor.execute('SET LOCAL synchronous_commit = off')
+    for columns, rows in runs:
+        # Stay under the driver's bind parameter limit
+        batch_size = min(INSERT_BATCH_SIZE, max(1, MAX_INSERT_PARAMS // len(columns)))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            inserted += _insert_batch(cursor, real_name, columns, batch, multi_row, errors, max_errors)
+    return inserted, errors
+
+
+def _insert_batch(cursor, real_name, columns, batch, multi_row, errors, max_errors):
+    try:
+        with transaction.atomic():
+            if len(batch) == 1:
+                cursor.execute(insert_sql(real_name, columns), batch[0][1])
+            elif multi_row:
+                cursor.execute(
+                    insert_many_sql(real_name, columns, len(batch)),
+                    [value for _, values in batch for value in values]
+                )
+            else:
+                cursor.executemany(insert_sql(real_name, columns), [values for _, values in batch])
+        return len(batch)
+    except Exception as e:
+        if len(batch) == 1:
+            # Rejected (constraint, type...)
+            if max_errors is None or len(errors) < max_errors:
+                errors.append((batch[0][0], str(e)))
+            return 0
+    # A few bad rows cost O(log n) retries this way, not one per row
+    middle = len(batch) // 2
+    return (
+        _insert_batch(cursor, real_name, columns, batch[:middle], multi_row, errors, max_errors)
+        + _insert_batch(cursor, real_name, columns, batch[middle:], multi_row, errors, max_errors)
+    )
+
+
+# ============================================
+# KEYSET PAGINATION
+# ============================================
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(
+        json.dumps(values, separators=(',', ':'), default=str).encode()
+    ).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Raises ValueError for anything that isn't a cursor we issued"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(values, list) or len(values) != 3 or not isinstance(values[2], (int, str)):
+        raise ValueError('invalid cursor')
+    return values
+
+
+def cursor_seek(token, sort, order, key='rowid'):
+    """
+    Keyset pieces (seek WHERE, params, ORDER BY, next-cursor builder) for an
+    opaque cursor of [sort column, last sort value, last key]. `key` is the
+    unique tie-breaker: rowid (selected last), or a primary key column.
+    Rows are ordered by (sort IS NULL, sort, key) so NULLs have a fixed
+    place on every backend and the (sort, key) row-value comparison holds.
+    """
+    desc = order == 'desc'
+    key_sql = 'rowid' if key == 'rowid' else quote_ident(key)
+    
+    def make_cursor(row, columns):
+        value = row[columns.index(sort)] if sort else None
+        last_key = row[-1] if key == 'rowid' else row[columns.index(key)]
+        return encode_cursor([sort, value, last_key])
+    
+    if not sort:
+        seek_sql, order_clause = (
+            (f'{key_sql} < %s', f'ORDER BY {key_sql} DESC') if desc else (f'{key_sql} > %s', f'ORDER BY {key_sql} ASC')
+        )
+    else:
+        col = quote_ident(sort)
+        if desc:
+            order_clause = f'ORDER BY {col} IS NULL DESC, {col} DESC, {key_sql} DESC'
+        else:
+            order_clause = f'ORDER BY {col} IS NULL, {col}, {key_sql}'
+    
+    if token == '':
+        # First page
+        return None, [], order_clause, make_cursor
+    
+    cursor_sort, value, last_key = decode_cursor(token)
+    if cursor_sort != sort:
+        raise ValueError('cursor was issued for a different sort')
+    if key == 'rowid' and not isinstance(last_key, int):
+        raise ValueError('invalid cursor')
+    
+    if not sort:
+        return seek_sql, [last_key], order_clause, make_cursor
+    if value is None:
+        if desc:
+            return f'({col} IS NOT NULL OR {key_sql} < %s)', [last_key], order_clause, make_cursor
+        return f'({col} IS NULL AND {key_sql} > %s)', [last_key], order_clause, make_cursor
+    if desc:
+        return f'({col} IS NOT NULL AND ({col}, {key_sql}) < (%s, %s))', [value, last_key], order_clause, make_cursor
+    return f'({col} IS NULL OR ({col}, {key_sql}) > (%s, %s))', [value, last_key], order_clause, make_cursor
+
+
+# ============================================
+# ROW COUNTS
+# ============================================
+
+def _row_count_key(real_name):
+    return f'rowcount:{real_name}'
+
+
+def _count_one(real_name):
+    """Exact row count for a single table (0 if the table can't be read)"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(count_sql(real_name))
+            return cursor.fetchone()[0]
+    except Exception:
+        return 0
+
+
+def _count_many(real_names):
+    """Exact row counts for many tables, one UNION ALL round trip per batch"""
+    counts = {}
+
+    for start in range(0, len(real_names), COUNT_BATCH_SIZE):
+        batch = real_names[start:start + COUNT_BATCH_SIZE]
+        sql = ' UNION ALL '.join(
+            f'SELECT {i} AS idx, COUNT(*) FROM {quote_ident(name)}' for i, name in enumerate(batch)
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+                by_idx = dict(cursor.fetchall())
+            for i, name in enumerate(batch):
+                counts[name] = by_idx.get(i, 0)
+        except Exception:
+            # One missing table fails the whole UNION - count this batch one by one
+            for name in batch:
+                counts[name] = _count_one(name)
+
+    return counts
+
+
+def _estimate_many(real_names):
+    """Planner estimates for the tables at or over ROW_COUNT_ESTIMATE_MIN rows (Postgres only)"""
+    if connection.vendor != 'postgresql':
+        return {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, reltuples::bigint FROM pg_class "
+                "WHERE relname = ANY(%s) AND relkind = 'r' "
+                "AND relnamespace = current_schema()::regnamespace",
+                [list(real_names)],
+            )
+            # reltuples is -1 until the table is first analyzed
+            return {name: rows for name, rows in cursor.fetchall() if rows >= ROW_COUNT_ESTIMATE_MIN}
+    except Exception:
+        return {}
+
+
+def _fresh_counts(real_names):
+    """Estimates for big Postgres tables, exact counts for the rest"""
+    counts = _estimate_many(real_names)
+    missing = [name for name in real_names if name not in counts]
+    if missing:
+        counts.update(_count_many(missing))
+    return counts
+
+
+def get_row_count(real_name):
+    """Row count for one table, served from cache when possible"""
+    if not TABLE_CACHE:
+        return _fresh_counts([real_name])[real_name]
+    return cache.get_or_set(
+        _row_count_key(real_name),
+        lambda: _fresh_counts([real_name])[real_name],
+        ROW_COUNT_TIMEOUT,
+    )
+
+
+def count_rows(real_names):
+    """
+    Row counts for many tables. Returns {real_name: row_count}.
+    Cached counts (with TABLE_CACHE) are reused, the rest are counted in a single query
+    (or estimated, for big Postgres tables).
+    """
+    real_names = list(real_names)
+    if not real_names:
+        return {}
+    if not TABLE_CACHE:
+        return _fresh_counts(real_names)
+
+    cached = cache.get_many([_row_count_key(name) for name in real_names])
+    counts = {}
+    missing = []
+    for name in real_names:
+        key = _row_count_key(name)
+        if key in cached:
+            counts[name] = cached[key]
+        else:
+            missing.append(name)
+
+    if missing:
+        fresh = _fresh_counts(missing)
+        cache.set_many(
+            {_row_count_key(name): count for name, count in fresh.items()},
+            ROW_COUNT_TIMEOUT,
+        )
+        counts.update(fresh)
+
+    return counts
+
+
+def invalidate_row_count(real_name):
+    """Call after rows are inserted/deleted or the table is created/dropped"""
+    cache.delete(_row_count_key(real_name))
+
+
+# ============================================
+# TABLE LOOKUPS
+# ============================================
+
+def _user_table_key(user_id, table_name):
+    # Bump the version when the cached dict's shape changes
+    return f'usertable:v3:{user_id}:{table_name}'
+
+
+def _pk_col(schema):
+    for col in schema:
+        if is_flag_set(col.get('pk')):
+            return col.get('name')
+    return 'id'
+
+
+def get_user_table(user, table_name):
+    """
+    One of the user's tables as a plain dict (real_name, schema, created_at,
+    plus the column names as a tuple `columns` and a frozenset `column_set`,
+    and `pk_col`, the primary key column or 'id' if none is marked),
+    None if it doesn't exist. Served from cache (with TABLE_CACHE); only hits
+    are cached, so a table created a moment ago is found straight away.
+    """
+    key = _user_table_key(user.id, table_name)
+    user_table = cache.get(key) if TABLE_CACHE else None
+    if user_table is None:
+        user_table = UserTable.objects.filter(user=user, table_name=table_name).values(
+            'real_name', 'schema', 'created_at'
+        ).first()
+        if user_table is not None:
+            columns = tuple(col.get('name') for col in user_table['schema'])
+            user_table['columns'] = columns
+            user_table['column_set'] = frozenset(columns)
+            user_table['pk_col'] = _pk_col(user_table['schema'])
+            if TABLE_CACHE:
+                cache.set(key, user_table, USER_TABLE_TIMEOUT)
+    return user_table
+
+
+def get_user_table_for_update(user, table_name):
+    """
+    The UserTable row itself, for views that change or drop it: read fresh
+    (not from the cache, which may lag a concurrent change) and only with
+    the fields they use. None if it doesn't exist.
+    
+    Call it inside the transaction.atomic() block that changes the table.
+    On Postgres the row stays locked (SELECT ... FOR UPDATE) until that
+    block ends, so concurrent schema changes to one table run one after
+    the other. SQLite has no row locks, but it refuses to commit a write
+    from a transaction whose read went stale, so a concurrent change fails
+    rather than being overwritten.
+    """
+    return UserTable.objects.select_for_update().filter(user=user, table_name=table_name).only(
+        'user', 'table_name', 'real_name', 'schema'
+    ).first()
+
+
+# Postgres expressions that edit UserTable.schema (jsonb) in place, so a
+# column change sends only the delta rather than the whole array
+SCHEMA_APPEND_SQL = 'schema || %s::jsonb'
+SCHEMA_RENAME_SQL = (
+    "(SELECT jsonb_agg(CASE WHEN elem->>'name' = %s"
+    " THEN jsonb_set(elem, '{name}', to_jsonb(%s::text)) ELSE elem END ORDER BY ord)"
+    " FROM jsonb_array_elements(schema) WITH ORDINALITY AS t(elem, ord))"
+)
+SCHEMA_REMOVE_SQL = (
+    "COALESCE((SELECT jsonb_agg(elem ORDER BY ord)"
+    " FROM jsonb_array_elements(schema) WITH ORDINALITY AS t(elem, ord)"
+    " WHERE elem->>'name' <> %s), '[]'::jsonb)"
+)
+
+
+def save_schema(user_table, pg_sql, pg_params):
+    """
+    Persist an edited user_table.schema: on Postgres by applying pg_sql to
+    the stored value, elsewhere by saving the whole field.
+    """
+    if connection.vendor == 'postgresql':
+        UserTable.objects.filter(pk=user_table.pk).update(schema=RawSQL(pg_sql, pg_params))
+        # update() doesn't send post_save. Drop the cached copy once the new
+        # schema is visible, so no request re-caches the old one meanwhile
+        user_id, table_name = user_table.user_id, user_table.table_name
+        transaction.on_commit(lambda: invalidate_user_table(user_id, table_name))
+    else:
+        user_table.save(update_fields=['schema'])
+
+
+def limit_ddl_lock_wait(cursor):
+    """
+    On Postgres, make DDL in the current transaction fail after
+    DDL_LOCK_TIMEOUT instead of waiting for its lock behind a long query:
+    a waiting ALTER TABLE holds up every later query on the table, and the
+    request thread with it. Call inside transaction.atomic().
+    """
+    if connection.vendor == 'postgresql' and DDL_LOCK_TIMEOUT:
+        cursor.execute(f"SET LOCAL lock_timeout = '{int(DDL_LOCK_TIMEOUT)}ms'")
+
+
+def get_real_name(user, table_name):
+    """Physical table name for one of the user's tables, None if it doesn't exist"""
+    user_table = get_user_table(user, table_name)
+    return user_table['real_name'] if user_table is not None else None
+
+
+def _table_list_key(user_id):
+    return f'usertables:{user_id}'
+
+
+def list_user_tables(user_id):
+    """
+    The user's tables as dicts of table_name, real_name and created_at
+    (no schema), served from cache with TABLE_CACHE
+    """
+    key = _table_list_key(user_id)
+    tables = cache.get(key) if TABLE_CACHE else None
+    if tables is None:
+        tables = list(UserTable.objects.filter(user_id=user_id).values(
+            'table_name', 'real_name', 'created_at'
+        ))
+        if TABLE_CACHE:
+            cache.set(key, tables, TABLE_LIST_TIMEOUT)
+    return tables
+
+
+def invalidate_user_table(user_id, table_name):
+    """Called from the UserTable post_save/post_delete signals"""
+    cache.delete_many([_user_table_key(user_id, table_name), _table_list_key(user_id)])
@@ -0,0 +1,28 @@
+"""
+orjson-backed JSON renderer for DRF.
+Row lists dominate response CPU and orjson encodes them several times
+faster than the stdlib json module DRF uses by default.
+"""
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Types orjson doesn't know (Decimal, bytes, lazy strings...) - same handling as DRF"""
+    return _fallback_encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=self.options)
@@ -1,5 +1,12 @@
+import re
+
 from rest_framework import serializers
 from .models import UserTable
+from .queries import is_valid_column_type, is_valid_identifier
+
+
+# Table names end up inside the physical name u<id>_<name>, so a leading digit is fine
+TABLE_NAME_RE = re.compile(r'[A-Za-z0-9_]+')
 
 
 class UserTableSerializer(serializers.ModelSerializer):
@@ -17,16 +24,25 @@ class CreateTableSerializer(serializers.Serializer):
         value = value.strip()
         if not value:
             raise serializers.ValidationError("Table name is required")
-        if not value.replace('_', '').isalnum():
+        if not TABLE_NAME_RE.fullmatch(value):
             raise serializers.ValidationError("Use only letters, numbers, and underscores")
         return value
 
     def validate_columns(self, value):
         if len(value) == 0:
             raise serializers.ValidationError("At least one column is required")
+        names = [str(col.get('name', '')).strip() for col in value]
+        if not all(names):
+            raise serializers.ValidationError("Column name cannot be empty")
+        invalid = [name for name in names if not is_valid_identifier(name)]
+        if invalid:
+            raise serializers.ValidationError(
+                f"Invalid column name: {invalid[0]} (use letters, numbers and underscores, not starting with a number)"
+            )
         for col in value:
-            if not col.get('name', '').strip():
-                raise serializers.ValidationError("Column name cannot be empty")
+            col_type = str(col.get('type', 'TEXT')).upper()
+            if not is_valid_column_type(col_type):
+                raise serializers.ValidationError(f"Invalid column type: {col_type}")
         return value
 
 
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import key_filter
+from .models import APIKey, UserTable, api_key_cache_key
+from .queries import invalidate_user_table
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Per-connection SQLite settings (connections are reused, see CONN_MAX_AGE)"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # 64MB page cache instead of the 2MB default
+        cursor.execute('PRAGMA cache_size = -64000')
+        # Readers don't block the writer, and commits skip the per-transaction fsync
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def drop_cached_api_key(sender, instance, **kwargs):
+    """Revoked/deactivated keys must stop authenticating immediately"""
+    cache.delete(api_key_cache_key(instance.key_hash))
+
+
+@receiver(post_save, sender=APIKey)
+def refresh_api_key_filter(sender, instance, **kwargs):
+    """New or reactivated keys must get past the filter (once committed, so rebuilds see them)"""
+    if instance.is_active:
+        transaction.on_commit(key_filter.invalidate)
+
+
+@receiver(post_save, sender=UserTable)
+@receiver(post_delete, sender=UserTable)
+def drop_cached_user_table(sender, instance, **kwargs):
+    """Schema changes and dropped tables (also via user deletion cascade)"""
+    invalidate_user_table(instance.user_id, instance.table_name)
@@ -1,3 +1,637 @@
-from django.test import TestCase
+import gzip
+import secrets
+from collections import Counter
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from authentication_app import backends
+
+from . import activity, auto_index, import_queue, key_filter, models, views
+from .models import ActivityLog, APIKey, UserTable
+from .queries import quote_ident
+from .views import IMPORT_MAX_REPORTED_ERRORS
+
+
+ITEM_COLUMNS = [
+    {'name': 'name', 'type': 'TEXT', 'notnull': True, 'unique': True},
+    {'name': 'qty', 'type': 'INTEGER'},
+]
+EXPORTED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class TableTestMixin:
+    """A logged-in user with an "items" table"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/tables/', {'name': 'items', 'columns': ITEM_COLUMNS}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.real_name = UserTable.objects.get(user=self.user, table_name='items').real_name
+
+    def import_rows(self, data, **extra):
+        return self.client.post('/api/tables/items/import/', {'format': 'json', 'data': data, **extra}, format='json')
+
+    def stored_names(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT name FROM {quote_ident(self.real_name)} ORDER BY rowid')
+            return [name for name, in cursor.fetchall()]
+
+
+def error_rows(errors):
+    """Row indexes from "Row <i>: <message>" strings"""
+    return [int(error.split(':', 1)[0].removeprefix('Row ')) for error in errors]
+
+
+class TableImportTests(TableTestMixin, TestCase):
+
+    def test_bad_rows_are_reported_by_index(self):
+        response = self.import_rows([
+            {'name': 'a', 'qty': 1},
+            {'nope': 1},             # unknown column
+            {'name': 'a'},           # duplicate of row 0
+            'not a row',
+            {},
+            {'name': 'b', 'qty': 2},
+            {'qty': 3},              # name is NOT NULL
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual(response.data['total_errors'], 5)
+        self.assertEqual(error_rows(response.data['errors']), [1, 2, 3, 4, 6])
+        self.assertIn('Unknown column(s): nope', response.data['errors'][0])
+        self.assertEqual(self.stored_names(), ['a', 'b'])
+
+    def test_reported_errors_are_capped(self):
+        count = IMPORT_MAX_REPORTED_ERRORS + 5
+        response = self.import_rows([{'name': 'a'}] + [{'name': 'a'}] * count)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(response.data['total_errors'], count)
+        self.assertEqual(error_rows(response.data['errors']), list(range(1, IMPORT_MAX_REPORTED_ERRORS + 1)))
+
+    def test_nothing_imported_is_a_bad_request(self):
+        response = self.import_rows([{'nope': 1}, 'not a row'])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['imported'], 0)
+        self.assertEqual(response.data['total_errors'], 2)
+        self.assertEqual(self.stored_names(), [])
+
+
+# import_queue.flush() runs close_old_connections(), which needs autocommit:
+# TestCase's wrapping transaction would be closed under it
+class QueuedImportTests(TableTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        # Flush only from the test, and log synchronously
+        patches = [
+            mock.patch.object(import_queue, '_ensure_worker'),
+            mock.patch.object(activity, 'BATCH_SIZE', 1),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        super().setUp()
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {quote_ident(self.real_name)}')
+
+    def test_wait_false_answers_202_and_writes_on_flush(self):
+        response = self.import_rows([{'name': 'a'}, {'nope': 1}, {'name': 'b'}], wait=False)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['queued'], 2)
+        self.assertEqual(response.data['total_errors'], 1)
+        self.assertEqual(error_rows(response.data['errors']), [1])
+        self.assertEqual(self.stored_names(), [])
+
+        import_queue.flush()
+        self.assertEqual(self.stored_names(), ['a', 'b'])
+
+    def test_wait_false_with_only_bad_rows_queues_nothing(self):
+        response = self.import_rows([{'nope': 1}], wait=False)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['queued'], 0)
+        self.assertTrue(import_queue._queue.empty())
+
+
+class KeysetPageTests(TableTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        response = self.import_rows([{'name': name} for name in 'abc'])
+        self.assertEqual(response.status_code, 201)
+        _, raw_key = APIKey.create_key(self.user, 'tests')
+        self.api = APIClient()
+        self.api.credentials(HTTP_X_API_KEY=raw_key)
+
+    def get_rows(self, query):
+        response = self.api.get(f'/api/v1/tables/items/rows/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_limit_below_one_is_clamped(self):
+        for query in ('limit=0&after_rowid=0', 'limit=-5&after_rowid=0'):
+            data = self.get_rows(query)
+            self.assertEqual(data['limit'], 1)
+            self.assertEqual([row['name'] for row in data['rows']], ['a'])
+            self.assertEqual(data['next_cursor'], 1)
+
+        data = self.get_rows('limit=0')
+        self.assertEqual(data['limit'], 1)
+        self.assertEqual(data['total_pages'], 3)
+
+    def test_limit_above_max_is_clamped(self):
+        self.assertEqual(self.get_rows('limit=500&after_rowid=0')['limit'], 100)
+
+    def test_walk_to_the_last_page(self):
+        names = []
+        query = 'limit=2&after_rowid=0'
+        while True:
+            data = self.get_rows(query)
+            names += [row['name'] for row in data['rows']]
+            if data['next_cursor'] is None:
+                break
+            query = f'limit=2&after_rowid={data["next_cursor"]}'
+        self.assertEqual(names, ['a', 'b', 'c'])
+
+
+class CursorPageTests(TableTestMixin, TestCase):
+    """?cursor= pages over a sort column with NULLs and ties"""
+
+    QTYS = [3, None, 1, 3, None, 2, 3]
+
+    def setUp(self):
+        super().setUp()
+        data = [{'name': f'r{i}', 'qty': qty} for i, qty in enumerate(self.QTYS)]
+        self.assertEqual(self.import_rows(data).status_code, 201)
+        _, raw_key = APIKey.create_key(self.user, 'tests')
+        self.api = APIClient()
+        self.api.credentials(HTTP_X_API_KEY=raw_key)
+
+    def walk(self, order, limit=2):
+        names = []
+        page_cursor = ''
+        while page_cursor is not None:
+            response = self.api.get('/api/v1/tables/items/rows/', {
+                'sort': 'qty', 'order': order, 'limit': limit, 'cursor': page_cursor,
+            })
+            self.assertEqual(response.status_code, 200, response.content)
+            names += [row['name'] for row in response.data['rows']]
+            page_cursor = response.data['next_cursor']
+        return names
+
+    def expected(self, reverse):
+        # NULLs last ascending (first descending), ties broken by insertion order
+        rows = sorted(
+            range(len(self.QTYS)),
+            key=lambda i: (self.QTYS[i] is None, self.QTYS[i] or 0, i),
+            reverse=reverse,
+        )
+        return [f'r{i}' for i in rows]
+
+    def test_round_trip_ascending(self):
+        for limit in (1, 2, 3):
+            self.assertEqual(self.walk('asc', limit), self.expected(reverse=False))
+
+    def test_round_trip_descending(self):
+        for limit in (1, 2, 3):
+            self.assertEqual(self.walk('desc', limit), self.expected(reverse=True))
+
+    def test_cursor_for_another_sort_is_rejected(self):
+        first = self.api.get('/api/v1/tables/items/rows/', {'sort': 'qty', 'limit': 2, 'cursor': ''})
+        response = self.api.get('/api/v1/tables/items/rows/', {
+            'sort': 'name', 'limit': 2, 'cursor': first.data['next_cursor'],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.api.get('/api/v1/tables/items/rows/?cursor=garbage').status_code, 400)
+
+
+class AutoIndexTests(TableTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.logged = mock.Mock()
+        patches = [
+            mock.patch.object(auto_index, '_ensure_worker'),
+            mock.patch.object(auto_index, 'THRESHOLD', 2),
+            mock.patch.object(auto_index, 'MAX_PER_USER', 1),
+            mock.patch.object(auto_index.activity, 'enqueue', self.logged),
+            mock.patch.object(auto_index, '_hits', Counter()),
+            mock.patch.object(auto_index, '_done', set()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        super().setUp()
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {quote_ident(self.real_name)}')
+
+    def index_entries(self):
+        return sum(call.kwargs['action'] == 'AUTO_INDEX' for call in self.logged.call_args_list)
+
+    def filter_on(self, col, times=2):
+        for _ in range(times):
+            auto_index.record(self.user.id, 'items', self.real_name, [col])
+        auto_index.run_once()
+
+    def test_existing_index_is_not_built_again_after_a_restart(self):
+        self.filter_on('qty')
+        self.assertEqual(auto_index._existing_indexes(self.user.id), {auto_index.index_name(self.real_name, 'qty')})
+        self.assertEqual(self.index_entries(), 1)
+
+        auto_index._done.clear()  # what a new process starts with
+        self.filter_on('qty')
+        self.assertEqual(self.index_entries(), 1)
+
+    def test_cap_counts_indexes_in_the_catalog(self):
+        self.filter_on('qty')
+        auto_index._done.clear()
+        self.filter_on('name')
+
+        self.assertEqual(auto_index._existing_indexes(self.user.id), {auto_index.index_name(self.real_name, 'qty')})
+        self.assertEqual(self.index_entries(), 1)
+
+    def test_only_index_friendly_filters_are_counted(self):
+        _, raw_key = APIKey.create_key(self.user, 'tests')
+        api = APIClient()
+        api.credentials(HTTP_X_API_KEY=raw_key)
+        for query in ('name__contains=a', 'name__icontains=a', 'qty__gte=1', 'qty=2'):
+            self.assertEqual(api.get(f'/api/v1/tables/items/rows/?{query}').status_code, 200)
+
+        self.assertEqual(dict(auto_index._hits), {(self.user.id, 'items', self.real_name, 'qty'): 2})
+
+
+class PublicRowsByKeyTests(TestCase):
+    """The public row endpoints as they run on Postgres: rows addressed by the primary key, no rowid"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        columns = [{'name': 'id', 'type': 'INTEGER', 'pk': True}, {'name': 'name', 'type': 'TEXT'}]
+        self.assertEqual(client.post('/api/tables/', {'name': 'items', 'columns': columns}, format='json').status_code, 201)
+        self.assertEqual(client.post('/api/tables/', {'name': 'bare', 'columns': ITEM_COLUMNS}, format='json').status_code, 201)
+        for name in 'abc':
+            client.post('/api/tables/items/import/', {'data': [{'id': ord(name), 'name': name}]}, format='json')
+        _, raw_key = APIKey.create_key(self.user, 'tests')
+        self.api = APIClient()
+        self.api.credentials(HTTP_X_API_KEY=raw_key)
+        patch = mock.patch('table_logic.api_views._row_key', lambda user_table: user_table['pk_col'])
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_pages_key_on_the_primary_key(self):
+        response = self.api.get('/api/v1/tables/items/rows/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'][0], {'id': 97, 'name': 'a'})
+
+        response = self.api.get('/api/v1/tables/items/rows/?limit=2&after_rowid=0')
+        self.assertEqual([row['name'] for row in response.data['rows']], ['a', 'b'])
+        self.assertEqual(response.data['next_cursor'], 98)
+
+        response = self.api.get('/api/v1/tables/items/rows/?limit=2&cursor=&sort=name&order=desc')
+        self.assertEqual([row['name'] for row in response.data['rows']], ['c', 'b'])
+        response = self.api.get(f'/api/v1/tables/items/rows/?limit=2&sort=name&order=desc&cursor={response.data["next_cursor"]}')
+        self.assertEqual([row['name'] for row in response.data['rows']], ['a'])
+
+    def test_row_detail_by_primary_key(self):
+        response = self.api.get('/api/v1/tables/items/rows/98/?fields=name')
+        self.assertEqual(response.data['row'], {'name': 'b', 'id': 98})
+
+        self.assertEqual(self.api.put('/api/v1/tables/items/rows/98/', {'name': 'B'}, format='json').status_code, 200)
+        self.assertEqual(self.api.get('/api/v1/tables/items/rows/98/').data['row'], {'id': 98, 'name': 'B'})
+
+        self.assertEqual(self.api.delete('/api/v1/tables/items/rows/98/').status_code, 200)
+        self.assertEqual(self.api.get('/api/v1/tables/items/rows/98/').status_code, 404)
+
+    def test_table_without_primary_key(self):
+        self.assertEqual(self.api.get('/api/v1/tables/bare/rows/').status_code, 200)
+        self.assertEqual(self.api.get('/api/v1/tables/bare/rows/?after_rowid=0').status_code, 400)
+        self.assertEqual(self.api.get('/api/v1/tables/bare/rows/1/').status_code, 400)
+
+
+class KeyFilterTests(TestCase):
+    """The Bloom filter must never turn away a key that exists"""
+
+    def setUp(self):
+        cache.clear()
+        patch = mock.patch.object(key_filter, 'ENABLED', True)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def create_key(self, name='tests'):
+        # The filter is refreshed once the key has committed
+        with self.captureOnCommitCallbacks(execute=True):
+            return APIKey.create_key(self.user, name)
+
+    def test_new_key_authenticates_straight_away(self):
+        _, first_key = self.create_key()
+        self.assertIsNotNone(APIKey.authenticate(first_key))  # filter built
+
+        _, second_key = self.create_key('second')
+        api_key = APIKey.authenticate(second_key)
+        self.assertIsNotNone(api_key)
+        self.assertEqual(api_key.user, self.user)
+
+    def test_revoked_key_is_rejected(self):
+        api_key, raw_key = self.create_key()
+        self.assertIsNotNone(APIKey.authenticate(raw_key))
+
+        api_key.is_active = False
+        api_key.save()
+        self.assertIsNone(APIKey.authenticate(raw_key))
+
+    def test_unknown_key_is_rejected_without_a_query(self):
+        _, raw_key = self.create_key()
+        APIKey.authenticate(raw_key)  # filter built
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(APIKey.authenticate(f'sk_{secrets.token_hex(32)}'))
+        self.assertIsNone(APIKey.authenticate('sk_short'))
+
+
+class APIKeyCacheTests(TestCase):
+    """With a shared cache, repeat authentications skip the database"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.api_key, self.raw_key = APIKey.create_key(self.user, 'tests')
+
+    def enable_caches(self, enabled=True):
+        for target, name in ((models, 'API_KEY_CACHE'), (backends, 'USER_CACHE')):
+            patch = mock.patch.object(target, name, enabled)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_cached_key_needs_no_queries(self):
+        self.enable_caches()
+        self.assertIsNotNone(APIKey.authenticate(self.raw_key))
+
+        with self.assertNumQueries(0):
+            api_key = APIKey.authenticate(self.raw_key)
+        self.assertEqual(api_key.pk, self.api_key.pk)
+        self.assertEqual(api_key.user, self.user)
+
+    def test_revoked_key_drops_out_of_the_cache(self):
+        self.enable_caches()
+        self.assertIsNotNone(APIKey.authenticate(self.raw_key))
+
+        self.api_key.is_active = False
+        self.api_key.save()
+        self.assertIsNone(APIKey.authenticate(self.raw_key))
+
+    def test_without_the_cache_every_call_queries(self):
+        self.enable_caches(False)
+        # The key, its user and the last_used_at update
+        with self.assertNumQueries(3):
+            self.assertIsNotNone(APIKey.authenticate(self.raw_key))
+        # last_used_at is throttled, the lookups are not
+        with self.assertNumQueries(2):
+            self.assertIsNotNone(APIKey.authenticate(self.raw_key))
+
+
+class LastUsedThrottleTests(TestCase):
+    """last_used_at is written at most once per LAST_USED_INTERVAL"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.api_key, self.raw_key = APIKey.create_key(self.user, 'tests')
+
+    def last_used_at(self):
+        return APIKey.objects.values_list('last_used_at', flat=True).get(pk=self.api_key.pk)
+
+    def test_first_call_stamps_last_used_at(self):
+        APIKey.authenticate(self.raw_key)
+        self.assertIsNotNone(self.last_used_at())
+
+    def test_repeat_calls_within_the_interval_skip_the_write(self):
+        APIKey.authenticate(self.raw_key)
+        APIKey.objects.filter(pk=self.api_key.pk).update(last_used_at=None)
+
+        api_key = APIKey.authenticate(self.raw_key)
+        self.assertIsNotNone(api_key.last_used_at)
+        self.assertIsNone(self.last_used_at())
+
+    def test_next_interval_writes_again(self):
+        APIKey.authenticate(self.raw_key)
+        APIKey.objects.filter(pk=self.api_key.pk).update(last_used_at=None)
+
+        cache.delete(f'apikey:used:{self.api_key.pk}')  # interval expired
+        APIKey.authenticate(self.raw_key)
+        self.assertIsNotNone(self.last_used_at())
+
+
+class BulkInsertTests(TableTestMixin, TestCase):
+    """POSTing a list to the public rows endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        _, raw_key = APIKey.create_key(self.user, 'tests')
+        self.api = APIClient()
+        self.api.credentials(HTTP_X_API_KEY=raw_key)
+
+    def insert(self, rows):
+        return self.api.post('/api/v1/tables/items/rows/', rows, format='json')
+
+    def test_rows_are_inserted(self):
+        response = self.insert([{'name': 'a', 'qty': 1}, {'name': 'b', 'qty': 2}])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(self.stored_names(), ['a', 'b'])
+
+    def test_too_many_rows_are_refused(self):
+        response = self.insert([{'name': str(i)} for i in range(1001)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stored_names(), [])
+
+        self.assertEqual(self.insert([{'name': str(i)} for i in range(1000)]).status_code, 201)
+
+    def test_rows_with_different_columns_are_refused(self):
+        response = self.insert([{'name': 'a', 'qty': 1}, {'name': 'b'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Row 1', response.data['error'])
+        self.assertEqual(self.stored_names(), [])
+
+    def test_ids_are_returned_with_returning(self):
+        # INSERT ... RETURNING, as on Postgres
+        patch = mock.patch('table_logic.api_views._returning_column', lambda user_table: 'rowid')
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        response = self.insert([{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+        self.assertEqual(response.status_code, 201, response.content)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {quote_ident(self.real_name)} ORDER BY rowid')
+            self.assertEqual(response.data['ids'], [rowid for rowid, in cursor.fetchall()])
+
+
+class DropColumnRebuildTests(TableTestMixin, TestCase):
+    """The create/copy/drop/rename fallback for columns SQLite can't DROP"""
+
+    def setUp(self):
+        super().setUp()
+        _, raw_key = APIKey.create_key(self.user, 'tests')
+        self.api = APIClient()
+        self.api.credentials(HTTP_X_API_KEY=raw_key)
+
+    def sql(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def drop_indexed_column(self, table, col):
+        # An index on the column makes ALTER TABLE ... DROP COLUMN fail
+        real_name = UserTable.objects.get(user=self.user, table_name=table).real_name
+        self.sql(f'CREATE INDEX ix_{col} ON {quote_ident(real_name)} ({quote_ident(col)})')
+        response = self.api.delete(f'/api/v1/tables/{table}/columns/', {'name': col}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([c['name'] for c in UserTable.objects.get(user=self.user, table_name=table).schema],
+                         [c['name'] for c in self.columns if c['name'] != col])
+        return real_name
+
+    def table_sql(self, real_name):
+        return self.sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", [real_name])[0][0]
+
+    def test_rows_constraints_and_indexes_survive(self):
+        self.columns = ITEM_COLUMNS + [{'name': 'note', 'type': 'TEXT'}]
+        self.client.post('/api/tables/items/columns/', {'name': 'note', 'type': 'TEXT'}, format='json')
+        self.import_rows([{'name': name, 'qty': i} for i, name in enumerate('abc')])
+        self.sql(f'DELETE FROM {quote_ident(self.real_name)} WHERE name = %s', ['b'])
+        self.sql(f'CREATE INDEX ix_note ON {quote_ident(self.real_name)} (note)')
+
+        self.drop_indexed_column('items', 'qty')
+
+        self.assertEqual(self.sql(f'SELECT rowid, name FROM {quote_ident(self.real_name)} ORDER BY rowid'),
+                         [(1, 'a'), (3, 'c')])
+        self.assertIn('"name" TEXT NOT NULL UNIQUE', self.table_sql(self.real_name))
+        self.assertNotIn('qty', self.table_sql(self.real_name))
+        indexes = [name for name, in self.sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL", [self.real_name]
+        )]
+        self.assertEqual(indexes, ['ix_note'])
+
+    def test_autoincrement_primary_key_survives(self):
+        self.columns = [{'name': 'id', 'type': 'INTEGER', 'pk': True}, {'name': 'name', 'type': 'TEXT'}]
+        self.client.post('/api/tables/', {'name': 'keyed', 'columns': self.columns}, format='json')
+        self.client.post('/api/tables/keyed/import/', {'data': [{'name': name} for name in 'abc']}, format='json')
+        real_name = UserTable.objects.get(user=self.user, table_name='keyed').real_name
+        self.sql(f'DELETE FROM {quote_ident(real_name)} WHERE id = 3')
+
+        self.drop_indexed_column('keyed', 'name')
+
+        self.assertIn('"id" INTEGER PRIMARY KEY AUTOINCREMENT', self.table_sql(real_name))
+        # AUTOINCREMENT never hands out an id again, even the deleted last one
+        self.sql(f'INSERT INTO {quote_ident(real_name)} DEFAULT VALUES')
+        self.assertEqual(self.sql(f'SELECT id FROM {quote_ident(real_name)} ORDER BY id'), [(1,), (2,), (4,)])
+
+
+class GzipExportTests(TableTestMixin, TestCase):
+    """A gzipped export is the plain export, compressed"""
+
+    def setUp(self):
+        super().setUp()
+        self.import_rows([{'name': f'item {i}', 'qty': i} for i in range(25)] + [{'name': 'comma, "quote"'}])
+
+    def export(self, query, streaming, **headers):
+        response = self.client.get(f'/api/tables/items/export/?{query}', **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.streaming, streaming)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        if headers:
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            return gzip.decompress(body)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        return body
+
+    def assertSameExports(self, streaming):
+        for query in ('format=csv', 'format=json', 'format=json&pretty=1'):
+            with self.subTest(query), mock.patch('django.utils.timezone.now', return_value=EXPORTED_AT):
+                self.assertEqual(self.export(query, streaming, HTTP_ACCEPT_ENCODING='gzip, deflate'),
+                                 self.export(query, streaming))
+
+    def test_buffered_export(self):
+        self.assertSameExports(streaming=False)
+
+    def test_streamed_export(self):
+        for name, value in (('EXPORT_BUFFER_MAX_ROWS', 5), ('EXPORT_CHUNK_SIZE', 4)):
+            patch = mock.patch.object(views, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.assertSameExports(streaming=True)
+
+
+class DashboardPagingTests(TableTestMixin, TestCase):
+    """page/page_size on the dashboard rows and activity views"""
+
+    def setUp(self):
+        super().setUp()
+        self.import_rows([{'name': name} for name in 'abc'])
+
+    def get_rows(self, query):
+        response = self.client.get(f'/api/tables/items/rows/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_bad_integers_are_refused(self):
+        for query in ('page_size=abc', 'page=x', 'page_size=abc&cursor=', 'page_size=abc&search=a'):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f'/api/tables/items/rows/?{query}').status_code, 400)
+        self.assertEqual(self.client.get('/api/activity/?limit=abc').status_code, 400)
+
+    def test_page_size_is_clamped(self):
+        for query in ('page_size=0', 'page_size=-5', 'page_size=0&cursor=', 'page_size=0&search=a'):
+            with self.subTest(query):
+                data = self.get_rows(query)
+                self.assertEqual(data['page_size'], 1)
+                self.assertEqual(len(data['rows']), 1)
+        self.assertEqual(self.get_rows('page_size=500')['page_size'], 100)
+        self.assertEqual(self.get_rows('page_size=500&cursor=')['page_size'], 100)
+
+        data = self.client.get('/api/activity/?limit=0').data
+        self.assertEqual((data['page_size'], data['total_pages']), (1, data['total']))
+
+    def test_page_below_one_is_the_first_page(self):
+        data = self.get_rows('page=-1&page_size=2')
+        self.assertEqual(data['page'], 1)
+        self.assertEqual([row['name'] for row in data['rows']], ['a', 'b'])
+
+
+# flush() closes old connections, as in QueuedImportTests
+class ActivityQueueTests(TransactionTestCase):
+
+    def setUp(self):
+        for patch in (mock.patch.object(activity, '_ensure_worker'), mock.patch.object(activity, 'BATCH_SIZE', 100)):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def log(self, action, at):
+        with mock.patch.object(activity.timezone, 'now', return_value=at):
+            activity.enqueue(user=self.user, action=action, table_name='items', description=action)
+
+    def test_entries_keep_the_time_they_were_queued(self):
+        first, second = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc)
+        self.log('FIRST', first)
+        self.log('SECOND', second)
+        self.assertFalse(ActivityLog.objects.exists())
+
+        activity.flush()
+        logs = ActivityLog.objects.order_by('-created_at', '-id')
+        self.assertEqual([(log.action, log.created_at) for log in logs], [('SECOND', second), ('FIRST', first)])
@@ -1,12 +1,59 @@
+import heapq
+import json
+import logging
+import re
+import zlib
+from datetime import datetime
+from itertools import chain, islice
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.db import connection
+from rest_framework.negotiation import DefaultContentNegotiation
+from django.db import IntegrityError, connection, transaction
 from django.core.paginator import Paginator
+from django.utils.cache import patch_vary_headers
+from django.db.models import Count, Q, Window
 
+from . import activity, auto_index, import_queue
 from .models import UserTable, ActivityLog
 from .serializers import CreateTableSerializer
+from .queries import (
+    SCHEMA_APPEND_SQL,
+    SCHEMA_REMOVE_SQL,
+    SCHEMA_RENAME_SQL,
+    column_type_sql,
+    count_rows,
+    count_sql,
+    cursor_seek,
+    decode_cursor,
+    delete_by_key_sql,
+    encode_cursor,
+    delete_by_rowid_sql,
+    get_row_count,
+    get_user_table,
+    get_user_table_for_update,
+    insert_rows,
+    insert_sql,
+    invalidate_row_count,
+    is_flag_set,
+    is_valid_column_type,
+    is_valid_identifier,
+    like_where_sql,
+    limit_ddl_lock_wait,
+    list_user_tables,
+    quote_ident,
+    save_schema,
+    select_keyset_sql,
+    select_page_sql,
+    select_page_with_total_sql,
+    update_by_key_sql,
+    update_by_rowid_sql,
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 # ============================================
@@ -18,16 +65,11 @@ def log_activity(user, action, table_name, description, metadata=None, request=N
     
     Actions: CREATE_TABLE, DELETE_TABLE, INSERT_ROW, UPDATE_ROW, DELETE_ROW
     """
-    ip_address = None
-    if request:
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip_address = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip_address = request.META.get('REMOTE_ADDR')
+    ip_address = activity.client_ip(request) if request else None
     
-    ActivityLog.objects.create(
-        user=user,
+    # Written in batches by a background thread, off the request path
+    activity.enqueue(
+        user_id=user.id,
         action=action,
         table_name=table_name,
         description=description,
@@ -44,29 +86,21 @@ class TableListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        tables = UserTable.objects.filter(user=request.user)
+        tables = list_user_tables(request.user.id)
+        # One UNION ALL query instead of a COUNT(*) round trip per table
+        row_counts = count_rows(table['real_name'] for table in tables)
         result = []
         
         for table in tables:
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute(f'SELECT COUNT(*) FROM "{table.real_name}"')
-                    row_count = cursor.fetchone()[0]
-            except:
-                row_count = 0
-            
             result.append({
-                'name': table.table_name,
-                'row_count': row_count,
+                'name': table['table_name'],
+                'row_count': row_counts.get(table['real_name'], 0),
             })
         
         return Response(result)
 
     def post(self, request):
-        # Debug: Print received data
-        print("=" * 50)
-        print("RECEIVED DATA:", request.data)
-        print("=" * 50)
+        logger.debug('Create table request: %s', request.data)
         
         serializer = CreateTableSerializer(data=request.data)
         
@@ -79,15 +113,8 @@ class TableListCreateView(APIView):
         table_name = serializer.validated_data['name']
         columns = serializer.validated_data['columns']
         
-        # Check if table already exists for this user
-        if UserTable.objects.filter(user=request.user, table_name=table_name).exists():
-            return Response({
-                'success': False,
-                'error': f'Table "{table_name}" already exists'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         # Validate: Only one primary key allowed
-        pk_count = sum(1 for col in columns if col.get('pk') in [True, 'true', 'True', 1, '1'])
+        pk_count = sum(1 for col in columns if is_flag_set(col.get('pk')))
         if pk_count > 1:
             return Response({
                 'success': False,
@@ -98,60 +125,52 @@ class TableListCreateView(APIView):
         real_name = f"u{request.user.id}_{table_name}"
         
         # Build CREATE TABLE SQL
+        is_sqlite = connection.vendor == 'sqlite'
         column_defs = []
         for col in columns:
             col_name = col.get('name', '').strip()
-            col_type = col.get('type', 'TEXT').upper()
-            
-            # Handle boolean values (could be string 'true'/'false' or actual boolean)
-            is_pk = col.get('pk') in [True, 'true', 'True', 1, '1']
-            is_notnull = col.get('notnull') in [True, 'true', 'True', 1, '1']
-            is_unique = col.get('unique') in [True, 'true', 'True', 1, '1']
-            
-            # Build column definition
             # Map types for PostgreSQL
-            if connection.vendor != 'sqlite':
-                if col_type == 'BLOB':
-                    col_type = 'BYTEA'
-                elif col_type == 'DATETIME':
-                    col_type = 'TIMESTAMP'
-
+            col_type = column_type_sql(col.get('type', 'TEXT').upper())
+            
             # Build column definition
-            if is_pk:
-                if connection.vendor == 'sqlite':
+            if is_flag_set(col.get('pk')):
+                if is_sqlite:
                     if col_type == 'INTEGER':
                         # SQLite requires exact syntax for auto-increment
-                        col_def = f'"{col_name}" INTEGER PRIMARY KEY AUTOINCREMENT'
+                        col_def = f'{quote_ident(col_name)} INTEGER PRIMARY KEY AUTOINCREMENT'
                     else:
-                        col_def = f'"{col_name}" {col_type} PRIMARY KEY'
+                        col_def = f'{quote_ident(col_name)} {col_type} PRIMARY KEY'
                 else:
                     # PostgreSQL
                     if col_type == 'INTEGER':
                         # SERIAL implies INTEGER + AUTOINCREMENT + PRIMARY KEY (implied) + NOT NULL
-                        col_def = f'"{col_name}" SERIAL PRIMARY KEY'
+                        col_def = f'{quote_ident(col_name)} SERIAL PRIMARY KEY'
                     else:
-                        col_def = f'"{col_name}" {col_type} PRIMARY KEY'
+                        col_def = f'{quote_ident(col_name)} {col_type} PRIMARY KEY'
             else:
-                col_def = f'"{col_name}" {col_type}'
-                if is_notnull:
+                col_def = f'{quote_ident(col_name)} {col_type}'
+                if is_flag_set(col.get('notnull')):
                     col_def += ' NOT NULL'
-                if is_unique:
+                if is_flag_set(col.get('unique')):
                     col_def += ' UNIQUE'
             
             column_defs.append(col_def)
         
-        sql = f'CREATE TABLE "{real_name}" ({", ".join(column_defs)})'
+        sql = f'CREATE TABLE {quote_ident(real_name)} ({", ".join(column_defs)})'
         
         try:
-            with connection.cursor() as cursor:
-                cursor.execute(sql)
-            
-            UserTable.objects.create(
-                user=request.user,
-                table_name=table_name,
-                real_name=real_name,
-                schema=columns
-            )
+            # The unique (user, table_name) index turns a duplicate, even two
+            # racing creates, into an IntegrityError before the CREATE TABLE runs
+            with transaction.atomic():
+                UserTable.objects.create(
+                    user=request.user,
+                    table_name=table_name,
+                    real_name=real_name,
+                    schema=columns
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+            invalidate_row_count(real_name)
             
             # Log activity
             log_activity(
@@ -168,10 +187,13 @@ class TableListCreateView(APIView):
                 'message': f'Table "{table_name}" created successfully'
             }, status=status.HTTP_201_CREATED)
         
+        except IntegrityError:
+            return Response({
+                'success': False,
+                'error': f'Table "{table_name}" already exists'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            # Log the SQL for debugging
-            print(f"SQL Error: {sql}")
-            print(f"Error: {str(e)}")
+            logger.exception('Failed to create table: %s', sql)
             return Response({
                 'success': False,
                 'error': str(e)
@@ -186,17 +208,20 @@ class TableDetailView(APIView):
 
     def delete(self, request, table_name):
         try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({
-                'success': False,
-                'error': 'Table not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(f'DROP TABLE IF EXISTS "{user_table.real_name}"')
-            user_table.delete()
+            # The table and its UserTable row go together or not at all
+            with transaction.atomic():
+                user_table = get_user_table_for_update(request.user, table_name)
+                if user_table is None:
+                    return Response({
+                        'success': False,
+                        'error': 'Table not found'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE IF EXISTS {quote_ident(user_table.real_name)}')
+                user_table.delete()
+            invalidate_row_count(user_table.real_name)
+            auto_index.forget_table(user_table.real_name)
             
             # Log activity
             log_activity(
@@ -225,28 +250,34 @@ class TableSchemaView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, table_name):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(f'SELECT COUNT(*) FROM "{user_table.real_name}"')
-                row_count = cursor.fetchone()[0]
-        except:
-            row_count = 0
+        # Cached, and estimated for big Postgres tables (see queries.get_row_count)
+        row_count = get_row_count(user_table['real_name'])
         
         return Response({
             'table_name': table_name,
             'row_count': row_count,
-            'columns': user_table.schema,
+            'columns': user_table['schema'],
         })
 
 
+def _unknown_columns_error(column_set, keys):
+    """400 response if any row key isn't one of the table's columns, else None"""
+    unknown = [key for key in keys if key not in column_set]
+    if not unknown:
+        return None
+    return Response({
+        'success': False,
+        'error': f'Unknown column(s): {", ".join(map(str, unknown))}'
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
 class TableRowsView(APIView):
     """
     GET: Get rows with pagination and search
@@ -255,70 +286,88 @@ class TableRowsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, table_name):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 25))
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 25)), 1), 100)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'page and page_size must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
         search = request.query_params.get('search', '').strip()
         sort = request.query_params.get('sort', '')
         order = request.query_params.get('order', 'asc').lower()
+        page_cursor = request.query_params.get('cursor')
         offset = (page - 1) * page_size
         
         try:
+            real_name = user_table['real_name']
+            schema_columns = user_table['columns']
+            
+            # Search across all columns, plus column-specific filters
+            params = []
+            search_columns = ()
+            vendor = connection.vendor
+            if search:
+                search_columns = schema_columns
+                # Postgres matches one expression over all columns (see like_where_sql)
+                params.extend([f'%{search}%'] * (1 if vendor == 'postgresql' else len(schema_columns)))
+                auto_index.record_search(request.user.id, table_name, real_name, schema_columns)
+            
+            # Walk the (few) query params rather than every schema column;
+            # the WHERE itself is cached per (columns, filters) shape
+            column_set = user_table['column_set']
+            filter_columns = []
+            for col, filter_value in request.query_params.items():
+                if filter_value and col in column_set:
+                    filter_columns.append(col)
+                    params.append(f'%{filter_value}%')
+            
+            where_sql = like_where_sql(search_columns, tuple(filter_columns), vendor)
+            
+            if page_cursor is not None:
+                return self._keyset_page(user_table, where_sql, params, page_cursor, sort, order, page_size)
+            
+            # Build ORDER BY clause
+            order_clause = ""
+            if sort and sort in user_table['column_set']:
+                order_direction = "DESC" if order == "desc" else "ASC"
+                order_clause = f'ORDER BY {quote_ident(sort)} {order_direction}'
+            
+            # PostgreSQL has no rowid column
+            with_rowid = connection.vendor == 'sqlite'
+            
             with connection.cursor() as cursor:
-                # Get column names from schema
-                schema_columns = [col.get('name') for col in user_table.schema]
-                
-                # Build WHERE clause for search
-                where_clause = ""
-                params = []
-                
-                if search:
-                    # Search across all text columns
-                    search_conditions = []
-                    for col in schema_columns:
-                        search_conditions.append(f'CAST("{col}" AS TEXT) LIKE ?')
-                        params.append(f'%{search}%')
-                    where_clause = f"WHERE ({' OR '.join(search_conditions)})"
-                
-                # Check for column-specific filters
-                for col in schema_columns:
-                    filter_value = request.query_params.get(col)
-                    if filter_value:
-                        if where_clause:
-                            where_clause += f' AND "{col}" LIKE ?'
-                        else:
-                            where_clause = f'WHERE "{col}" LIKE ?'
-                        params.append(f'%{filter_value}%')
-                
-                # Build ORDER BY clause
-                order_clause = ""
-                if sort and sort in schema_columns:
-                    order_direction = "DESC" if order == "desc" else "ASC"
-                    order_clause = f'ORDER BY "{sort}" {order_direction}'
-                
-                # Get total count with filters
-                count_sql = f'SELECT COUNT(*) FROM "{user_table.real_name}" {where_clause}'
-                cursor.execute(count_sql, params)
-                total = cursor.fetchone()[0]
-                
-                # Get rows with pagination
-                if connection.vendor == 'sqlite':
-                    # SQLite: Explicitly select rowid
-                    rows_sql = f'SELECT *, rowid FROM "{user_table.real_name}" {where_clause} {order_clause} LIMIT {page_size} OFFSET {offset}'
+                if where_sql:
+                    # Filtered total rides along as a window column - one statement, one scan
+                    rows_sql = select_page_with_total_sql(real_name, where_sql, order_clause, with_rowid)
+                    cursor.execute(rows_sql, [*params, page_size, offset])
+                    columns = [desc[0] for desc in cursor.description[:-1]]
+                    fetched = cursor.fetchall()
+                    if fetched:
+                        # columns leaves out the total, so zip() drops it below
+                        # without copying each row first
+                        total = fetched[0][-1]
+                    elif offset > 0:
+                        # Past the last page - the window has no row to report on
+                        cursor.execute(count_sql(real_name, where_sql), params)
+                        total = cursor.fetchone()[0]
+                    else:
+                        total = 0
                 else:
-                    # PostgreSQL: No rowid column, just select all
-                    rows_sql = f'SELECT * FROM "{user_table.real_name}" {where_clause} {order_clause} LIMIT {page_size} OFFSET {offset}'
-                
-                cursor.execute(rows_sql, params)
-                columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                    # Unfiltered counts come from the row count cache
+                    total = get_row_count(real_name)
+                    cursor.execute(select_page_sql(real_name, '', order_clause, with_rowid), [page_size, offset])
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                    fetched = cursor.fetchall()
+                rows = [dict(zip(columns, row)) for row in fetched]
             
             return Response({
                 'rows': rows,
@@ -332,10 +381,53 @@ class TableRowsView(APIView):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def post(self, request, table_name):
+    def _keyset_page(self, user_table, where_sql, params, page_cursor, sort, order, page_size):
+        """
+        ?cursor= pages (empty for the first one, then the response's
+        next_cursor): seeks past the previous page instead of using OFFSET,
+        so deep pages cost the same as the first. No total is counted.
+        """
+        real_name = user_table['real_name']
+        column_set = user_table['column_set']
+        
+        # PostgreSQL has no rowid, page on the primary key there
+        if connection.vendor == 'sqlite':
+            key = 'rowid'
+        else:
+            key = user_table['pk_col']
+            if key not in column_set:
+                return Response({
+                    'success': False,
+                    'error': 'Cursor pagination needs a primary key column'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        sort_col = sort if sort in column_set else None
         try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+            seek_sql, seek_params, order_clause, make_cursor = cursor_seek(page_cursor, sort_col, order, key)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if seek_sql:
+            where_sql = f'{where_sql} AND {seek_sql}' if where_sql else f'WHERE {seek_sql}'
+        
+        with connection.cursor() as cursor:
+            rows_sql = select_keyset_sql(real_name, where_sql, order_clause, with_rowid=key == 'rowid')
+            cursor.execute(rows_sql, [*params, *seek_params, page_size])
+            columns = tuple(desc[0] for desc in cursor.description) if cursor.description else ()
+            fetched = cursor.fetchall()
+        
+        return Response({
+            'rows': [dict(zip(columns, row)) for row in fetched],
+            'page_size': page_size,
+            'next_cursor': make_cursor(fetched[-1], columns) if fetched and len(fetched) == page_size else None,
+        })
+
+    def post(self, request, table_name):
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
@@ -343,33 +435,22 @@ class TableRowsView(APIView):
         
         try:
             data = request.data
-            print(f"INSERT DATA: {data}")  # Debug
+            error = _unknown_columns_error(user_table['column_set'], data.keys())
+            if error is not None:
+                return error
             
-            columns = list(data.keys())
+            real_name = user_table['real_name']
+            columns = tuple(data.keys())
             values = list(data.values())
-            placeholders = ', '.join(['%s' for _ in values])
-            columns_str = ', '.join([f'"{col}"' for col in columns])
-            
-            sql = f'INSERT INTO "{user_table.real_name}" ({columns_str}) VALUES ({placeholders})'
-            print(f"INSERT SQL: {sql}")  # Debug
-            print(f"VALUES: {values}")  # Debug
-            
-            if connection.vendor == 'postgresql':
-                # Find PK column
-                pk_col = 'id'
-                for col in user_table.schema:
-                    if col.get('pk'):
-                        pk_col = col.get('name')
-                        break
-                        
-                sql += f' RETURNING "{pk_col}"'
-                with connection.cursor() as cursor:
-                    cursor.execute(sql, values)
+            
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(insert_sql(real_name, columns, user_table['pk_col']), values)
                     new_row_id = cursor.fetchone()[0]
-            else:
-                with connection.cursor() as cursor:
-                    cursor.execute(sql, values)
+                else:
+                    cursor.execute(insert_sql(real_name, columns), values)
                     new_row_id = cursor.lastrowid
+            invalidate_row_count(real_name)
             
             # Log activity
             log_activity(
@@ -387,7 +468,6 @@ class TableRowsView(APIView):
                 'id': new_row_id
             }, status=status.HTTP_201_CREATED)
         except Exception as e:
-            print(f"INSERT ERROR: {str(e)}")  # Debug
             return Response({
                 'success': False,
                 'error': str(e)
@@ -402,9 +482,8 @@ class TableRowDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def put(self, request, table_name, row_id):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
@@ -412,56 +491,23 @@ class TableRowDetailView(APIView):
         
         try:
             data = request.data
+            error = _unknown_columns_error(user_table['column_set'], data.keys())
+            if error is not None:
+                return error
             
-            # Determine if we should use rowid or pk_col
-            use_rowid = str(row_id).isdigit()
-            if connection.vendor != 'sqlite':
-                use_rowid = False
+            real_name = user_table['real_name']
+            columns = tuple(data.keys())
+            pk_col = user_table['pk_col']
+            values = [*data.values(), row_id]
             
-            # Prepare set clause
-            # We must use %s for values to prevent SQL injection
-            set_clause_parts = []
-            values = []
-            for col, val in data.items():
-                set_clause_parts.append(f'"{col}" = %s')
-                values.append(val)
+            # The dashboard sends the rowid on SQLite and the primary key on Postgres
+            use_rowid = str(row_id).isdigit() and connection.vendor == 'sqlite'
             
-            set_clause = ', '.join(set_clause_parts)
-            values.append(row_id) # Add row_id for the WHERE clause
-            
-            if use_rowid:
-                sql = f'UPDATE "{user_table.real_name}" SET {set_clause} WHERE rowid = %s'
-            else:
-                # Find primary key column name from schema
-                pk_col = 'id' # Default
-                for col in user_table.schema:
-                    if col.get('pk'):
-                        pk_col = col.get('name')
-                        break
-                sql = f'UPDATE "{user_table.real_name}" SET {set_clause} WHERE "{pk_col}" = %s'
-            
-            print(f"DEBUG UPDATE: Table={user_table.real_name}, UseRowID={use_rowid}, ID={row_id}")
-            print(f"DEBUG SQL: {sql}")
-
             with connection.cursor() as cursor:
-                cursor.execute(sql, values)
-                updated_count = cursor.rowcount
-                print(f"DEBUG RESULT: Updated {updated_count} rows")
-                
-            # Retry logic if rowid failed
-            if updated_count == 0 and use_rowid:
-                 # Find primary key column name just in case
-                pk_col = 'id'
-                for col in user_table.schema:
-                    if col.get('pk'):
-                        pk_col = col.get('name')
-                        break
-                
-                if pk_col.lower() != 'rowid':
-                     sql_retry = f'UPDATE "{user_table.real_name}" SET {set_clause} WHERE "{pk_col}" = %s'
-                     print(f"DEBUG RETRY: {sql_retry}")
-                     with connection.cursor() as cursor:
-                        cursor.execute(sql_retry, values) # values already has row_id at end
+                if use_rowid:
+                    cursor.execute(update_by_rowid_sql(real_name, columns), values)
+                else:
+                    cursor.execute(update_by_key_sql(real_name, columns, pk_col), values)
             
             # Log activity
             log_activity(
@@ -478,67 +524,35 @@ class TableRowDetailView(APIView):
                 'message': 'Row updated'
             })
         except Exception as e:
-            print(f"UPDATE ERROR: {e}")
             return Response({
                 'success': False,
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def delete(self, request, table_name, row_id):
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'success': False,
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            # Determine if we should use rowid or pk_col
-            # If row_id is a number, try rowid first
-            use_rowid = str(row_id).isdigit()
-            if connection.vendor != 'sqlite':
-                use_rowid = False
-            
-            if use_rowid:
-                sql = f'DELETE FROM "{user_table.real_name}" WHERE rowid = %s'
-            else:
-                # Find primary key column name from schema
-                pk_col = 'id' # Default
-                for col in user_table.schema:
-                    if col.get('pk'):
-                        pk_col = col.get('name')
-                        break
-                sql = f'DELETE FROM "{user_table.real_name}" WHERE "{pk_col}" = %s'
+            real_name = user_table['real_name']
+            pk_col = user_table['pk_col']
             
-            print(f"DEBUG DELETE: Table={user_table.real_name}, UseRowID={use_rowid}, ID={row_id}")
-            print(f"DEBUG SQL: {sql}")
+            # The dashboard sends the rowid on SQLite and the primary key on Postgres
+            use_rowid = str(row_id).isdigit() and connection.vendor == 'sqlite'
             
             with connection.cursor() as cursor:
-                cursor.execute(sql, [row_id])
+                if use_rowid:
+                    cursor.execute(delete_by_rowid_sql(real_name), [row_id])
+                else:
+                    cursor.execute(delete_by_key_sql(real_name, pk_col), [row_id])
                 deleted_count = cursor.rowcount
-                print(f"DEBUG RESULT: Deleted {deleted_count} rows")
-            
-            # If rowid failed but it was a number, maybe it was actually a numeric PK?
-            # (Unlikely in SQLite unless WITHOUT ROWID, but safety fallback)
-            if deleted_count == 0 and use_rowid:
-                 # Find primary key column name just in case
-                pk_col = 'id'
-                for col in user_table.schema:
-                    if col.get('pk'):
-                        pk_col = col.get('name')
-                        break
-                
-                # Only retry if PK is not rowid (to avoid loop)
-                if pk_col.lower() != 'rowid': 
-                     sql_retry = f'DELETE FROM "{user_table.real_name}" WHERE "{pk_col}" = %s'
-                     print(f"DEBUG RETRY: {sql_retry}")
-                     with connection.cursor() as cursor:
-                        cursor.execute(sql_retry, [row_id])
-                        deleted_count = cursor.rowcount
 
-            if deleted_count == 0:
-                print("WARNING: No rows deleted! Check if ID matches exactly.")
+            if deleted_count:
+                invalidate_row_count(real_name)
             
             # Log activity
             log_activity(
@@ -572,16 +586,9 @@ class StatsView(APIView):
         from datetime import timedelta
         
         user = request.user
-        total_tables = UserTable.objects.filter(user=user).count()
-        
-        total_rows = 0
-        for table in UserTable.objects.filter(user=user):
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute(f'SELECT COUNT(*) FROM "{table.real_name}"')
-                    total_rows += cursor.fetchone()[0]
-            except:
-                pass
+        real_names = [table['real_name'] for table in list_user_tables(user.id)]
+        total_tables = len(real_names)
+        total_rows = sum(count_rows(real_names).values())
         
         # Count actions from today
         today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -603,15 +610,24 @@ class ActivityView(APIView):
     GET: Get activity logs with pagination and filtering
     """
     permission_classes = [IsAuthenticated]
+    
+    LOG_FIELDS = ('id', 'action', 'table_name', 'description', 'metadata', 'ip_address', 'created_at')
 
     def get(self, request):
         user = request.user
         
         # Query params
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('limit', 25))
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('limit', 25)), 1), 100)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'page and limit must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
         action_filter = request.query_params.get('action', None)
         table_filter = request.query_params.get('table', None)
+        page_cursor = request.query_params.get('cursor')
         
         # Base queryset - user's logs only, ordered by newest first
         logs = ActivityLog.objects.filter(user=user).order_by('-created_at')
@@ -622,40 +638,86 @@ class ActivityView(APIView):
         if table_filter:
             logs = logs.filter(table_name__icontains=table_filter)
         
-        # Get total before pagination
-        total = logs.count()
+        if page_cursor is not None:
+            return self._keyset_page(logs, page_cursor, page_size)
         
-        # Paginate
+        # Paginate, with the total riding along on every row (COUNT(*) OVER ())
+        # instead of a separate COUNT over the same filtered set
         offset = (page - 1) * page_size
-        logs = logs[offset:offset + page_size]
-        
-        # Format response
-        formatted_logs = []
-        for log in logs:
-            formatted_logs.append({
-                'id': log.id,
-                'action': log.action,
-                'table_name': log.table_name,
-                'description': log.description,
-                'metadata': log.metadata,
-                'ip_address': log.ip_address,
-                'created_at': log.created_at.isoformat(),
-                'time_ago': self._get_time_ago(log.created_at),
-            })
+        page_logs = list(
+            logs.annotate(total_count=Window(Count('id')))
+            .values(*self.LOG_FIELDS, 'total_count')[offset:offset + page_size]
+        )
+        if page_logs:
+            total = page_logs[0]['total_count']
+        elif offset > 0:
+            # Past the last page: no row to read the total from
+            total = logs.count()
+        else:
+            total = 0
         
         return Response({
-            'logs': formatted_logs,
+            'logs': self._format_logs(page_logs),
             'total': total,
             'page': page,
             'page_size': page_size,
-            'total_pages': (total + page_size - 1) // page_size if page_size > 0 else 0,
+            'total_pages': (total + page_size - 1) // page_size,
         })
     
-    def _get_time_ago(self, dt):
-        """Convert datetime to human-readable 'time ago' string"""
+    def _keyset_page(self, logs, page_cursor, page_size):
+        """
+        ?cursor= pages (empty for the first one, then the response's
+        next_cursor): seeks past the last (created_at, id) instead of using
+        OFFSET, so deep pages cost the same as the first. No total is counted.
+        """
+        logs = logs.order_by('-created_at', '-id')
+        if page_cursor:
+            try:
+                _, created_at, last_id = decode_cursor(page_cursor)
+                if not isinstance(last_id, int):
+                    raise ValueError('invalid cursor')
+                created_at = datetime.fromisoformat(created_at)
+            except (TypeError, ValueError):
+                return Response({
+                    'success': False,
+                    'error': 'Invalid cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            logs = logs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+        
+        page_logs = self._format_logs(logs.values(*self.LOG_FIELDS)[:page_size])
+        next_cursor = None
+        if page_logs and len(page_logs) == page_size:
+            last = page_logs[-1]
+            next_cursor = encode_cursor(['created_at', last['created_at'], last['id']])
+        
+        return Response({
+            'logs': page_logs,
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+        })
+    
+    def _format_logs(self, rows):
+        """Turn .values() rows into response dicts (no model instances built)"""
         from django.utils import timezone
         
         now = timezone.now()
+        logs = []
+        for log in rows:
+            created_at = log['created_at']
+            logs.append({
+                'id': log['id'],
+                'action': log['action'],
+                'table_name': log['table_name'],
+                'description': log['description'],
+                'metadata': log['metadata'],
+                'ip_address': log['ip_address'],
+                'created_at': created_at.isoformat(),
+                'time_ago': self._get_time_ago(created_at, now),
+            })
+        return logs
+    
+    def _get_time_ago(self, dt, now):
+        """Convert datetime to human-readable 'time ago' string"""
         diff = now - dt
         
         seconds = diff.total_seconds()
@@ -679,78 +741,203 @@ class ActivityView(APIView):
 # EXPORT / IMPORT VIEWS
 # ============================================
 
+# Rows fetched per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 1000
+
+# Exports of tables below this many rows (cached count) are built in
+# memory and sent whole; bigger ones are streamed
+EXPORT_BUFFER_MAX_ROWS = 1000
+
+# Error messages an import response lists (total_errors counts them all)
+IMPORT_MAX_REPORTED_ERRORS = 10
+
+# Exports are gzipped for clients that accept it, at this zlib level
+EXPORT_GZIP_LEVEL = 1
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+
+
+class ExportFormatNegotiation(DefaultContentNegotiation):
+    """?format= picks the export format here, not a DRF renderer"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def _iter_rows(real_name, columns):
+    """All rows of a table as tuples, EXPORT_CHUNK_SIZE at a time"""
+    select_list = ', '.join(map(quote_ident, columns))
+    # A server-side cursor on Postgres, so each fetchmany() pulls one chunk
+    # instead of the driver holding the whole result from execute() on
+    # (a plain cursor elsewhere, or with DISABLE_SERVER_SIDE_CURSORS)
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(f'SELECT {select_list} FROM {quote_ident(real_name)}')
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                return
+            yield rows
+
+
+class _RowChunks:
+    """A table's rows via _iter_rows, counting the rows read so far"""
+    
+    def __init__(self, real_name, columns):
+        self.real_name = real_name
+        self.columns = columns
+        self.count = 0
+    
+    def __iter__(self):
+        for rows in _iter_rows(self.real_name, self.columns):
+            self.count += len(rows)
+            yield rows
+
+
+def _gzip_chunks(chunks):
+    """
+    Gzip a stream chunk by chunk (GZipMiddleware would need it all first).
+    Level EXPORT_GZIP_LEVEL: exports still shrink several times over at
+    far less CPU than the default 6.
+    """
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _export_csv(row_chunks, columns):
+    import csv
+    import io
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in row_chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _export_json(table_name, row_chunks, schema, columns):
+    """
+    The export document, compact and built a chunk at a time with orjson.
+    Values orjson doesn't handle natively (Decimal, datetimes) go through
+    str() as before, so the exported values don't change.
+    """
+    import orjson
+    from django.utils import timezone
+    
+    options = orjson.OPT_PASSTHROUGH_DATETIME
+    # The header object minus its closing brace, then the rows array
+    header = orjson.dumps({'table_name': table_name, 'columns': schema}, default=str)
+    yield header[:-1] + b',"rows":['
+    row_count = 0
+    for rows in row_chunks:
+        # One dumps() per chunk, brackets stripped: only the chunk's dicts
+        # are alive at once, and orjson loops over them in C
+        chunk = orjson.dumps([dict(zip(columns, row)) for row in rows], default=str, option=options)[1:-1]
+        yield (b',' if row_count else b'') + chunk
+        row_count += len(rows)
+    yield b'],"row_count":%d,"exported_at":%s}' % (row_count, orjson.dumps(timezone.now().isoformat()))
+
+
+def _export_json_pretty(table_name, row_chunks, schema, columns):
+    """Same document json.dumps(..., indent=2) would give, built a chunk at a time"""
+    import json
+    import textwrap
+    from django.utils import timezone
+    
+    header = json.dumps({'table_name': table_name, 'columns': schema}, indent=2, default=str)
+    yield header[:-2] + ',\n  "rows": ['
+    row_count = 0
+    for rows in row_chunks:
+        parts = []
+        for row in rows:
+            row_json = json.dumps(dict(zip(columns, row)), indent=2, default=str)
+            parts.append((',\n' if row_count else '\n') + textwrap.indent(row_json, '    '))
+            row_count += 1
+        yield ''.join(parts)
+    yield (
+        ('\n  ]' if row_count else ']')
+        + f',\n  "row_count": {row_count},\n  "exported_at": {json.dumps(timezone.now().isoformat())}\n}}'
+    )
+
+
 class TableExportView(APIView):
     """
     GET: Export table data as JSON or CSV
-    Query params: format=json|csv (default: json)
+    Query params: format=json|csv (default: json), pretty=1 to indent JSON
+    
+    Tables of more than EXPORT_BUFFER_MAX_ROWS rows are streamed: rows are
+    read and encoded EXPORT_CHUNK_SIZE at a time, so memory stays flat
+    however big the table is. Smaller ones are sent in one piece.
     """
     permission_classes = [IsAuthenticated]
+    content_negotiation_class = ExportFormatNegotiation
     
     def get(self, request, table_name):
-        from django.http import HttpResponse
-        from django.utils import timezone
-        import json
-        import csv
-        import io
+        from django.http import HttpResponse, StreamingHttpResponse
         
         # Get format
         export_format = request.query_params.get('format', 'json').lower()
         
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            with connection.cursor() as cursor:
-                # Get column names
-                columns = [col.get('name') for col in user_table.schema]
-                
-                # Get all rows
-                cursor.execute(f'SELECT * FROM "{user_table.real_name}"')
-                rows = cursor.fetchall()
-                
-                # Convert to list of dicts
-                rows_data = [dict(zip(columns, row)) for row in rows]
+            # Get column names
+            columns = list(user_table['columns'])
+            real_name = user_table['real_name']
+            # Cached count, only for the log entry: the response goes by the rows read
+            row_count = get_row_count(real_name)
             
             # Log activity
             log_activity(
                 user=request.user,
                 action='EXPORT_DATA',
                 table_name=table_name,
-                description=f'Exported {len(rows_data)} rows from "{table_name}" as {export_format.upper()}',
-                metadata={'format': export_format, 'row_count': len(rows_data)},
+                description=f'Exported {row_count} rows from "{table_name}" as {export_format.upper()}',
+                metadata={'format': export_format, 'row_count': row_count},
                 request=request
             )
             
+            row_chunks = _RowChunks(real_name, columns)
             if export_format == 'csv':
-                # Generate CSV
-                output = io.StringIO()
-                writer = csv.DictWriter(output, fieldnames=columns)
-                writer.writeheader()
-                writer.writerows(rows_data)
-                
-                response = HttpResponse(output.getvalue(), content_type='text/csv')
-                response['Content-Disposition'] = f'attachment; filename="{table_name}.csv"'
-                return response
+                chunks = _export_csv(row_chunks, columns)
+                content_type, extension = 'text/csv', 'csv'
             else:
-                # Generate JSON
-                export_data = {
-                    'table_name': table_name,
-                    'columns': user_table.schema,
-                    'rows': rows_data,
-                    'row_count': len(rows_data),
-                    'exported_at': timezone.now().isoformat(),
-                }
-                
-                response = HttpResponse(
-                    json.dumps(export_data, indent=2, default=str),
-                    content_type='application/json'
-                )
-                response['Content-Disposition'] = f'attachment; filename="{table_name}.json"'
-                return response
+                pretty = request.query_params.get('pretty') == '1'
+                export_json = _export_json_pretty if pretty else _export_json
+                chunks = export_json(table_name, row_chunks, user_table['schema'], columns)
+                content_type, extension = 'application/json', 'json'
+            
+            use_gzip = ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')) is not None
+            if use_gzip:
+                chunks = _gzip_chunks(chunks)
+            # Encode until the rows actually read pass EXPORT_BUFFER_MAX_ROWS
+            # (the cached count may be stale or an estimate)
+            buffered = []
+            for chunk in chunks:
+                buffered.append(chunk)
+                if row_chunks.count > EXPORT_BUFFER_MAX_ROWS:
+                    break
+            if row_chunks.count <= EXPORT_BUFFER_MAX_ROWS:
+                # Small table: send it in one piece, with a Content-Length
+                body = b''.join(chunk.encode() if isinstance(chunk, str) else chunk for chunk in buffered)
+                response = HttpResponse(body, content_type=content_type)
+            else:
+                response = StreamingHttpResponse(chain(buffered, chunks), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{table_name}.{extension}"'
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
                 
         except Exception as e:
             return Response({
@@ -761,16 +948,19 @@ class TableExportView(APIView):
 class TableImportView(APIView):
     """
     POST: Import data from JSON or CSV
-    Body: { "format": "json"|"csv", "data": [...] }
+    Body: { "format": "json"|"csv", "data": [...], "wait": true|false }
+    
+    "wait": false answers 202 once the rows are checked and leaves the
+    INSERTs to a background writer (import_queue), which batches many
+    small imports together; database errors then go to the log only.
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request, table_name):
         import json
         
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
+        user_table = get_user_table(request.user, table_name)
+        if user_table is None:
             return Response({
                 'error': 'Table not found'
             }, status=status.HTTP_404_NOT_FOUND)
@@ -791,28 +981,51 @@ class TableImportView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            inserted = 0
+            # Only the first IMPORT_MAX_REPORTED_ERRORS messages are kept;
+            # `rejected` counts them all
             errors = []
+            rejected = 0
             
+            # Check rows up front, then insert consecutive rows that share
+            # a column set in batches, all in one transaction
+            column_set = user_table['column_set']
+            runs = []  # [(columns, [(row index, values), ...]), ...]
             for i, row in enumerate(data):
                 if not isinstance(row, dict):
-                    errors.append(f'Row {i}: Not a valid object')
+                    message = 'Not a valid object'
+                elif not row:
+                    message = 'No columns'
+                else:
+                    unknown = [key for key in row if key not in column_set]
+                    message = f'Unknown column(s): {", ".join(unknown)}' if unknown else None
+                if message is not None:
+                    rejected += 1
+                    if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                        errors.append((i, message))
                     continue
-                
-                try:
-                    columns = list(row.keys())
-                    values = list(row.values())
-                    placeholders = ', '.join(['%s' for _ in values])
-                    columns_str = ', '.join([f'"{col}"' for col in columns])
-                    
-                    sql = f'INSERT INTO "{user_table.real_name}" ({columns_str}) VALUES ({placeholders})'
-                    
-                    with connection.cursor() as cursor:
-                        cursor.execute(sql, values)
-                    
-                    inserted += 1
-                except Exception as e:
-                    errors.append(f'Row {i}: {str(e)}')
+                columns = tuple(row.keys())
+                if not runs or runs[-1][0] != columns:
+                    runs.append((columns, []))
+                runs[-1][1].append((i, tuple(row.values())))
+            
+            real_name = user_table['real_name']
+            if request.data.get('wait', True) is False:
+                return self._queue_import(request, table_name, real_name, import_format, runs, errors, rejected)
+            
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    inserted, insert_errors = insert_rows(
+                        cursor, real_name, runs, max_errors=IMPORT_MAX_REPORTED_ERRORS
+                    )
+            rejected += sum(len(rows) for _, rows in runs) - inserted
+            # Both lists are in row order already
+            errors = [
+                f'Row {i}: {message}'
+                for i, message in islice(heapq.merge(errors, insert_errors), IMPORT_MAX_REPORTED_ERRORS)
+            ]
+            
+            if inserted:
+                invalidate_row_count(real_name)
             
             # Log activity
             log_activity(
@@ -820,21 +1033,42 @@ class TableImportView(APIView):
                 action='IMPORT_DATA',
                 table_name=table_name,
                 description=f'Imported {inserted} rows into "{table_name}" from {import_format.upper()}',
-                metadata={'format': import_format, 'imported': inserted, 'errors': len(errors)},
+                metadata={'format': import_format, 'imported': inserted, 'errors': rejected},
                 request=request
             )
             
             return Response({
                 'success': True,
                 'imported': inserted,
-                'errors': errors[:10] if errors else [],  # Return first 10 errors
-                'total_errors': len(errors),
+                'errors': errors,
+                'total_errors': rejected,
             }, status=status.HTTP_201_CREATED if inserted > 0 else status.HTTP_400_BAD_REQUEST)
             
         except Exception as e:
             return Response({
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def _queue_import(self, request, table_name, real_name, import_format, runs, errors, rejected):
+        """Hand the checked rows to the background writer and answer 202"""
+        queued = sum(len(rows) for _, rows in runs)
+        if queued:
+            import_queue.enqueue(real_name, runs)
+            log_activity(
+                user=request.user,
+                action='IMPORT_DATA',
+                table_name=table_name,
+                description=f'Queued {queued} rows for import into "{table_name}" from {import_format.upper()}',
+                metadata={'format': import_format, 'queued': queued, 'errors': rejected},
+                request=request
+            )
+        
+        return Response({
+            'success': True,
+            'queued': queued,
+            'errors': [f'Row {i}: {message}' for i, message in errors],
+            'total_errors': rejected,
+        }, status=status.HTTP_202_ACCEPTED if queued > 0 else status.HTTP_400_BAD_REQUEST)
 
 
 class TableColumnsView(APIView):
@@ -847,13 +1081,6 @@ class TableColumnsView(APIView):
 
     def post(self, request, table_name):
         """Add a new column to the table"""
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({
-                'error': 'Table not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
         col_name = request.data.get('name', '').strip()
         col_type = request.data.get('type', 'TEXT').upper()
         
@@ -862,30 +1089,48 @@ class TableColumnsView(APIView):
                 'error': 'Column name is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if not is_valid_identifier(col_name):
+            return Response({
+                'error': 'Use only letters, numbers and underscores in column names (not starting with a number)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not is_valid_column_type(col_type):
+            return Response({
+                'error': f'Invalid column type: {col_type}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # Map types for PostgreSQL
-        if connection.vendor != 'sqlite':
-            if col_type == 'BLOB':
-                col_type = 'BYTEA'
-            elif col_type == 'DATETIME':
-                col_type = 'TIMESTAMP'
+        col_type = column_type_sql(col_type)
         
         try:
-            with connection.cursor() as cursor:
-                sql = f'ALTER TABLE "{user_table.real_name}" ADD COLUMN "{col_name}" {col_type}'
-                cursor.execute(sql)
-            
-            # Update stored schema
-            schema = user_table.schema or []
-            schema.append({
-                'name': col_name,
-                'type': col_type,
-                'pk': False,
-                'notnull': False,
-                'unique': False,
-                'dflt_value': None
-            })
-            user_table.schema = schema
-            user_table.save()
+            # DDL and stored schema change together or not at all
+            with transaction.atomic():
+                user_table = get_user_table_for_update(request.user, table_name)
+                if user_table is None:
+                    return Response({
+                        'error': 'Table not found'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                
+                with connection.cursor() as cursor:
+                    limit_ddl_lock_wait(cursor)
+                    sql = f'ALTER TABLE {quote_ident(user_table.real_name)} ADD COLUMN {quote_ident(col_name)} {col_type}'
+                    cursor.execute(sql)
+                    # Searches now cover one more column, the old search index is no use
+                    auto_index.drop_search_index(
+                        cursor, user_table.real_name, [col.get('name') for col in user_table.schema or []]
+                    )
+                
+                # Update stored schema
+                new_col = {
+                    'name': col_name,
+                    'type': col_type,
+                    'pk': False,
+                    'notnull': False,
+                    'unique': False,
+                    'dflt_value': None
+                }
+                user_table.schema = (user_table.schema or []) + [new_col]
+                save_schema(user_table, SCHEMA_APPEND_SQL, [json.dumps([new_col])])
             
             log_activity(
                 user=request.user,
@@ -907,13 +1152,6 @@ class TableColumnsView(APIView):
 
     def put(self, request, table_name):
         """Rename a column"""
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({
-                'error': 'Table not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
         old_name = request.data.get('old_name', '').strip()
         new_name = request.data.get('new_name', '').strip()
         
@@ -927,19 +1165,38 @@ class TableColumnsView(APIView):
                 'error': 'New name must be different from old name'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if not is_valid_identifier(new_name):
+            return Response({
+                'error': 'Use only letters, numbers and underscores in column names (not starting with a number)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            with connection.cursor() as cursor:
-                sql = f'ALTER TABLE "{user_table.real_name}" RENAME COLUMN "{old_name}" TO "{new_name}"'
-                cursor.execute(sql)
-            
-            # Update stored schema
-            schema = user_table.schema or []
-            for col in schema:
-                if col.get('name') == old_name:
-                    col['name'] = new_name
-                    break
-            user_table.schema = schema
-            user_table.save()
+            with transaction.atomic():
+                user_table = get_user_table_for_update(request.user, table_name)
+                if user_table is None:
+                    return Response({
+                        'error': 'Table not found'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                
+                with connection.cursor() as cursor:
+                    limit_ddl_lock_wait(cursor)
+                    sql = (
+                        f'ALTER TABLE {quote_ident(user_table.real_name)} '
+                        f'RENAME COLUMN {quote_ident(old_name)} TO {quote_ident(new_name)}'
+                    )
+                    cursor.execute(sql)
+                    auto_index.drop_search_index(
+                        cursor, user_table.real_name, [col.get('name') for col in user_table.schema or []]
+                    )
+                
+                # Update stored schema
+                schema = user_table.schema or []
+                for col in schema:
+                    if col.get('name') == old_name:
+                        col['name'] = new_name
+                        break
+                user_table.schema = schema
+                save_schema(user_table, SCHEMA_RENAME_SQL, [old_name, new_name])
             
             log_activity(
                 user=request.user,
@@ -961,13 +1218,6 @@ class TableColumnsView(APIView):
 
     def delete(self, request, table_name):
         """Delete a column"""
-        try:
-            user_table = UserTable.objects.get(user=request.user, table_name=table_name)
-        except UserTable.DoesNotExist:
-            return Response({
-                'error': 'Table not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
         col_name = request.data.get('name', '').strip()
         
         if not col_name:
@@ -975,23 +1225,33 @@ class TableColumnsView(APIView):
                 'error': 'Column name is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if this is a primary key column
-        for col in user_table.schema or []:
-            if col.get('name') == col_name and col.get('pk'):
-                return Response({
-                    'error': 'Cannot delete primary key column'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
         try:
-            with connection.cursor() as cursor:
-                sql = f'ALTER TABLE "{user_table.real_name}" DROP COLUMN "{col_name}"'
-                cursor.execute(sql)
-            
-            # Update stored schema
-            schema = user_table.schema or []
-            schema = [col for col in schema if col.get('name') != col_name]
-            user_table.schema = schema
-            user_table.save()
+            with transaction.atomic():
+                user_table = get_user_table_for_update(request.user, table_name)
+                if user_table is None:
+                    return Response({
+                        'error': 'Table not found'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                
+                # Find the column once: for the primary key check and to drop it from the schema
+                schema = user_table.schema or []
+                index = next((i for i, col in enumerate(schema) if col.get('name') == col_name), None)
+                if index is not None and is_flag_set(schema[index].get('pk')):
+                    return Response({
+                        'error': 'Cannot delete primary key column'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                with connection.cursor() as cursor:
+                    limit_ddl_lock_wait(cursor)
+                    auto_index.drop_index(cursor, user_table.real_name, col_name)
+                    sql = f'ALTER TABLE {quote_ident(user_table.real_name)} DROP COLUMN {quote_ident(col_name)}'
+                    cursor.execute(sql)
+                
+                # Update stored schema
+                if index is not None:
+                    schema.pop(index)
+                user_table.schema = schema
+                save_schema(user_table, SCHEMA_REMOVE_SQL, [col_name])
             
             log_activity(
                 user=request.user,